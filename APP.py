@@ -1,146 +1,272 @@
-import json
-import os
+import queue
+import sys
+import time
 from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from tkinter import ttk
-import matplotlib.pyplot as plt
-
-def load_tasks(filename):
-    if not os.path.exists(filename):
-        return []
-    with open(filename, 'r') as file:
-        return json.load(file)
-
-def save_tasks(filename, tasks):
-    with open(filename, 'w') as file:
-        json.dump(tasks, file, indent=4)
-
-def add_task(tasks, task_name, priority, category, reminder_date):
-    start_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    tasks.append({
-        'name': task_name,
-        'priority': priority,
-        'completed': False,
-        'start_date': start_date,
-        'completion_date': None,
-        'category': category,
-        'reminder_date': reminder_date
-    })
-    save_tasks(filename, tasks)
-    update_task_list(tasks)
-
-def update_task_list(tasks):
-    # Clear the current tree view
-    for i in task_tree.get_children():
-        task_tree.delete(i)
-    
-    for task in tasks:
-        status = "✔️" if task['completed'] else "❌"
-        task_tree.insert("", "end", values=(status, task['name'], task['priority'], task['category'], task['reminder_date']))
-
-def mark_task_completed(tasks):
+from storage import open_storage
+from task_store import TaskStore, new_task
+from reminders import ReminderScheduler
+from task_tree import TaskTreeView
+from stats import TaskStats
+from chart_export import ChartExporter
+from search import SearchIndex, matches, tokenize
+from ordering import SortedIndex
+from history import History
+from archive import Archive, with_archived
+
+# Above this many tasks the Treeview only holds the rows around the visible window
+VIRTUAL_SCROLL_THRESHOLD = 500
+
+# Treeview columns that sort on a header click -> SortedIndex sort
+SORTABLE_COLUMNS = {"Priority": 'priority', "Category": 'category', "Reminder": 'reminder'}
+
+# How often to check whether another process changed the task file
+CHANGE_POLL_MS = 2000
+
+# How often to check for task writes that failed on the storage writer thread
+WRITE_ERROR_POLL_MS = 500
+
+# Due tasks listed in the reminder dialog; the rest are counted
+REMINDER_DIALOG_LINES = 20
+
+def load_tasks(storage):
+    return TaskStore(storage).load()
+
+def add_task(store, task_name, priority, category, reminder_date):
+    store.add(new_task(task_name, priority, category, reminder_date))
+    schedule_reminder_check()
+
+def mark_task_completed(store):
     selected_item = task_tree.selection()
     if selected_item:
-        task_index = task_tree.index(selected_item[0])
-        tasks[task_index]['completed'] = True
-        tasks[task_index]['completion_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        save_tasks(filename, tasks)
-        update_task_list(tasks)
+        task_id = int(selected_item[0])
+        if task_id not in store:
+            messagebox.showwarning("Warning", "That task was removed in another window.")
+            return
+        store.update(task_id, completed=True, completion_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     else:
         messagebox.showwarning("Warning", "Please select a task to mark as completed.")
 
-def remove_task(tasks):
+def remove_task(store):
     selected_item = task_tree.selection()
     if selected_item:
-        task_index = task_tree.index(selected_item[0])
-        tasks.pop(task_index)
-        save_tasks(filename, tasks)
-        update_task_list(tasks)
+        task_id = int(selected_item[0])
+        if task_id not in store:
+            messagebox.showwarning("Warning", "That task was removed in another window.")
+            return
+        store.remove(task_id)
     else:
         messagebox.showwarning("Warning", "Please select a task to remove.")
 
+def check_reminders():
+    global reminder_after_id
+    reminder_after_id = None
+    # Taken before the dialog opens: its event loop may reload the store.
+    # A task removed since it was scheduled is skipped.
+    due = [task for task in map(store.get, scheduler.pop_due()) if task is not None]
+    schedule_reminder_check()
+    if not due:
+        return
+    # One dialog for all of them, however many came due at once
+    lines = [f"Task '{task['name']}' is due on {task['reminder_date']}." for task in due[:REMINDER_DIALOG_LINES]]
+    if len(due) > REMINDER_DIALOG_LINES:
+        lines.append(f"... and {len(due) - REMINDER_DIALOG_LINES} more.")
+    messagebox.showinfo("Reminder" if len(due) == 1 else f"{len(due)} Reminders", "\n".join(lines))
+
+def schedule_reminder_check():
+    # One pending timer for the earliest reminder instead of polling
+    global reminder_after_id
+    if reminder_after_id is not None:
+        app.after_cancel(reminder_after_id)
+        reminder_after_id = None
+    next_due = scheduler.next_due()
+    if next_due is None:
+        return
+    # Wake up at least hourly so clock changes and sleep don't skew the timer
+    delay_ms = int(min(max(next_due - time.time(), 0), 3600) * 1000)
+    reminder_after_id = app.after(delay_ms, check_reminders)
+
+def poll_for_changes():
+    # Reload when another process (the CLI, a batch run) changed the tasks
+    if store.refresh():
+        schedule_reminder_check()
+    app.after(CHANGE_POLL_MS, poll_for_changes)
+
+def report_write_errors():
+    # Saving happens on the storage writer thread; its failures come back
+    # through write_errors and are shown from the Tk loop
+    errors = []
+    while True:
+        try:
+            errors.append(write_errors.get_nowait())
+        except queue.Empty:
+            break
+    if errors:
+        messagebox.showerror("Error", f"Could not save tasks: {errors[-1]}\nYour changes are kept and written with the next one.")
+    app.after(WRITE_ERROR_POLL_MS, report_write_errors)
+
+def undo_change(event=None):
+    # Ctrl+Z; the list updates itself through the store
+    if history.undo() is None:
+        app.bell()
+    schedule_reminder_check()
+
+def redo_change(event=None):
+    # Ctrl+Y
+    if history.redo() is None:
+        app.bell()
+    schedule_reminder_check()
+
+def apply_search(*args):
+    # Filter the task list as the user types
+    query = search_var.get()
+    terms = tokenize(query)
+    if not terms:
+        task_view.set_filter(None)
+    else:
+        task_view.set_filter(lambda task: matches(task, terms), search_index.search(query))
+
+def sort_by_column(column):
+    # Clicking the header the list is sorted on again reverses the order
+    global sort_column
+    sort = SORTABLE_COLUMNS[column]
+    reverse = column == sort_column and not task_view.reverse
+    index = sort_indexes.get(sort)
+    if index is None:
+        # Kept up to date from now on, so later clicks don't sort again
+        index = sort_indexes[sort] = store.subscribe(SortedIndex(sort))
+    task_view.set_sort(index.key, reverse, index)
+    sort_column = column
+    for name in columns:
+        arrow = (" ▼" if reverse else " ▲") if name == column else ""
+        task_tree.heading(name, text=name + arrow)
+
 def open_add_task_dialog():
     task_name = simpledialog.askstring("Task Name", "Enter the Task:")
     if task_name:
         priority = simpledialog.askstring("Priority", "Enter Priority (Low, Medium, High):").capitalize()
         category = simpledialog.askstring("Category", "Enter Category (e.g., Work, Personal, Shopping):")
         reminder_date = simpledialog.askstring("Reminder Date", "Set a Reminder Date (YYYY-MM-DD) or press Enter to skip:")
-        add_task(tasks, task_name, priority, category, reminder_date)
+        add_task(store, task_name, priority, category, reminder_date)
 
-def visualize_tasks(tasks):
-    completed_count = sum(1 for task in tasks if task['completed'])
-    uncompleted_count = len(tasks) - completed_count
+def visualize_tasks(stats):
+    # matplotlib is only loaded once a chart is asked for
+    import matplotlib.pyplot as plt
+    from charts import draw_summary
+    fig = plt.figure(figsize=(14, 6))
+    draw_summary(fig, stats)
+    plt.show()
 
-    # Pie chart for task completion
-    labels = ['Completed', 'Uncompleted']
-    sizes = [completed_count, uncompleted_count]
-    colors = ['#66c2a5', '#fc8d62']  # Colors for pie chart
+def export_charts():
+    # Render on the exporter's worker thread and check back from the Tk loop
+    future = exporter.export('summary', store, with_archived(stats, archive, store))
+    export_button.config(state="disabled")
+    app.after(100, lambda: check_export(future))
 
-    plt.figure(figsize=(8, 5))
-    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-    plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    plt.title('Task Completion Status')
-    plt.show()
+def check_export(future):
+    if not future.done():
+        app.after(100, lambda: check_export(future))
+        return
+    export_button.config(state="normal")
+    try:
+        messagebox.showinfo("Charts Saved", f"Charts saved to {future.result()}.")
+    except Exception as error:
+        messagebox.showerror("Error", f"Could not save charts: {error}")
 
-    # Optional: Bar chart for tasks per category
-    categories = {}
-    for task in tasks:
-        category = task['category']
-        if category in categories:
-            categories[category] += 1
-        else:
-            categories[category] = 1
-
-    plt.figure(figsize=(10, 5))
-    plt.bar(categories.keys(), categories.values(), color='#66c2a5')
-    plt.xlabel('Categories')
-    plt.ylabel('Number of Tasks')
-    plt.title('Number of Tasks per Category')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.show()
+if __name__ == "__main__":
+    # --instrument / --profile FILE (or TODO_INSTRUMENT / TODO_PROFILE) time
+    # the hot paths; see instrument.py
+    import instrument
+    instrument.configure(sys.argv[1:])
+    instrument.install(globals())
+
+    # Main application window
+    app = tk.Tk()
+    app.title("To-Do List Application")
+
+    # Load tasks from JSON file
+    filename = 'todo_list.json'
+    write_errors = queue.Queue()
+    store = load_tasks(open_storage(filename, on_error=write_errors.put))
+    # Old completed tasks move to the archive before the views are built
+    archive = Archive(filename)
+    archive.skip_ids(store)
+    archive.archive_completed(store)
+    scheduler = store.subscribe(ReminderScheduler())
+    stats = store.subscribe(TaskStats())
+    history = store.subscribe(History(store))
+    exporter = ChartExporter()
+    search_index = store.subscribe(SearchIndex())
+    sort_indexes = {}
+    sort_column = None
+    reminder_after_id = None
+
+    # Search box filtering the task list
+    search_frame = tk.Frame(app)
+    tk.Label(search_frame, text="Search:").pack(side="left")
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(search_frame, textvariable=search_var, width=40)
+    search_entry.pack(side="left")
+    search_frame.pack(pady=(10, 0))
 
-# Main application window
-app = tk.Tk()
-app.title("To-Do List Application")
+    # Create a Treeview to display tasks
+    tree_frame = tk.Frame(app)
+    columns = ("Status", "Task", "Priority", "Category", "Reminder")
+    task_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+    task_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
+    task_tree.heading("Status", text="Status")
+    task_tree.heading("Task", text="Task")
+    task_tree.heading("Priority", text="Priority", command=lambda: sort_by_column("Priority"))
+    task_tree.heading("Category", text="Category", command=lambda: sort_by_column("Category"))
+    task_tree.heading("Reminder", text="Reminder", command=lambda: sort_by_column("Reminder"))
 
-# Load tasks from JSON file
-filename = 'todo_list.json'
-tasks = load_tasks(filename)
+    # Set column widths
+    task_tree.column("Status", width=50)
+    task_tree.column("Task", width=250)
+    task_tree.column("Priority", width=100)
+    task_tree.column("Category", width=100)
+    task_tree.column("Reminder", width=100)
 
-# Create a Treeview to display tasks
-columns = ("Status", "Task", "Priority", "Category", "Reminder")
-task_tree = ttk.Treeview(app, columns=columns, show="headings")
-task_tree.heading("Status", text="Status")
-task_tree.heading("Task", text="Task")
-task_tree.heading("Priority", text="Priority")
-task_tree.heading("Category", text="Category")
-task_tree.heading("Reminder", text="Reminder")
+    task_tree.pack(side="left")
+    task_scrollbar.pack(side="right", fill="y")
+    tree_frame.pack(pady=10)
 
-# Set column widths
-task_tree.column("Status", width=50)
-task_tree.column("Task", width=250)
-task_tree.column("Priority", width=100)
-task_tree.column("Category", width=100)
-task_tree.column("Reminder", width=100)
+    # Buttons for adding, removing, marking tasks as complete, and visualizing tasks
+    add_task_button = tk.Button(app, text="Add Task", command=open_add_task_dialog)
+    add_task_button.pack(pady=5)
 
-task_tree.pack(pady=10)
+    remove_task_button = tk.Button(app, text="Remove Task", command=lambda: remove_task(store))
+    remove_task_button.pack(pady=5)
 
-# Buttons for adding, removing, marking tasks as complete, and visualizing tasks
-add_task_button = tk.Button(app, text="Add Task", command=open_add_task_dialog)
-add_task_button.pack(pady=5)
+    mark_completed_button = tk.Button(app, text="Mark as Completed", command=lambda: mark_task_completed(store))
+    mark_completed_button.pack(pady=5)
 
-remove_task_button = tk.Button(app, text="Remove Task", command=lambda: remove_task(tasks))
-remove_task_button.pack(pady=5)
+    visualize_button = tk.Button(app, text="Visualize Tasks", command=lambda: visualize_tasks(with_archived(stats, archive, store)))
+    visualize_button.pack(pady=5)
 
-mark_completed_button = tk.Button(app, text="Mark as Completed", command=lambda: mark_task_completed(tasks))
-mark_completed_button.pack(pady=5)
+    export_button = tk.Button(app, text="Save Charts to File", command=export_charts)
+    export_button.pack(pady=5)
 
-visualize_button = tk.Button(app, text="Visualize Tasks", command=lambda: visualize_tasks(tasks))
-visualize_button.pack(pady=5)
+    # Undo and redo of adds, removals and completions
+    undo_frame = tk.Frame(app)
+    tk.Button(undo_frame, text="Undo", command=undo_change).pack(side="left", padx=5)
+    tk.Button(undo_frame, text="Redo", command=redo_change).pack(side="left", padx=5)
+    undo_frame.pack(pady=5)
+    app.bind_all("<Control-z>", undo_change)
+    app.bind_all("<Control-y>", redo_change)
 
-update_task_list(tasks)  # Initial update of the task list
+    # Initial update of the task list; the view then follows every change to the store
+    task_view = store.subscribe(TaskTreeView(task_tree, task_scrollbar, virtual=len(store) > VIRTUAL_SCROLL_THRESHOLD))
+    search_var.trace_add("write", apply_search)
+    schedule_reminder_check()
+    app.after(CHANGE_POLL_MS, poll_for_changes)
+    app.after(WRITE_ERROR_POLL_MS, report_write_errors)
 
-# Start the Tkinter event loop
-app.mainloop()
+    # Start the Tkinter event loop
+    try:
+        app.mainloop()
+    finally:
+        exporter.close()
+        store.close()
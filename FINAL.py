@@ -1,178 +1,289 @@
-import json
 import os
+import sys
+from itertools import islice
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import numpy as np
-from tabulate import tabulate
+from storage import open_storage
+from task_store import TaskStore, new_task
+from reminders import ReminderScheduler
+from stats import TaskStats
+from chart_export import ChartExporter
+from task_io import ImportInterrupted, import_task_stream, iter_task_file, write_task_file
+from ordering import SortedIndex, SortedView, parse_view
+from history import History
+from archive import ARCHIVE_AFTER_DAYS, Archive, with_archived
 
-def load_tasks(filename):
-   
-    if not os.path.exists(filename):
-        return []
-    with open(filename, 'r') as file:
-        return json.load(file)
+# matplotlib, numpy and tabulate are imported where they are first needed, so
+# starting the menu doesn't pay for them until a chart, report or grid is shown
+
+# Lists longer than one page are shown a page at a time
+PAGE_SIZE = int(os.environ.get('TODO_PAGE_SIZE', 20))
 
-def save_tasks(filename, tasks):
+# Column headers and widths for the paged table
+TABLE_COLUMNS = [("ID", 6), ("Task", 30), ("Priority", 8), ("Completed", 9), ("Start Date", 19),
+                 ("Completion Date", 19), ("Category", 12), ("Reminder Date", 13)]
+
+def load_tasks(storage):
    
-    with open(filename, 'w') as file:
-        json.dump(tasks, file, indent=4)
+    return TaskStore(storage).load()
 
 def export_tasks(filename, tasks):
     
-    with open(filename, 'w') as file:
-        json.dump(tasks, file, indent=4)
+    # Use a .jsonl filename for JSON Lines, .bin for the binary format
+    write_task_file(filename, tasks)
     print(f'Tasks exported to {filename} successfully!')
 
 def import_tasks(filename):
     
     if not os.path.exists(filename):
         print(f"File {filename} does not exist.")
-        return []
-    with open(filename, 'r') as file:
-        return json.load(file)
+        return None
+    return iter_task_file(filename)
+
+def task_rows(tasks):
+    
+    for task in tasks:
+        priority = task.get('priority', 'Low')
+        status = "✓" if task.get('completed', False) else "✗"
+        start_date = task.get('start_date', 'N/A')
+        completion_date = task.get('completion_date', 'N/A')
+        category = task.get('category', 'N/A')
+        reminder_date = task.get('reminder_date', 'N/A')
+        yield [task['id'], task['name'], priority, status, start_date, completion_date, category, reminder_date]
+
+def format_row(row):
+    # Fixed-width line, so a row can be printed without looking at any other row
+    cells = []
+    for value, (_, width) in zip(row, TABLE_COLUMNS):
+        text = '' if value is None else str(value)
+        if len(text) > width:
+            text = text[:width - 1] + '…'
+        cells.append(text.ljust(width))
+    return '| ' + ' | '.join(cells) + ' |'
+
+def display_page(tasks, page, page_size):
+    
+    separator = '+' + '+'.join('-' * (width + 2) for _, width in TABLE_COLUMNS) + '+'
+    print(separator)
+    print(format_row([header for header, _ in TABLE_COLUMNS]))
+    print(separator.replace('-', '='))
+    start = page * page_size
+    if hasattr(tasks, '__getitem__'):
+        # Lists and sorted views hand out just the page
+        page_tasks = tasks[start:start + page_size]
+    else:
+        page_tasks = islice(tasks, start, start + page_size)
+    for row in task_rows(page_tasks):
+        print(format_row(row), flush=True)
+    print(separator)
+
+def browse_tasks(tasks):
+    
+    global PAGE_SIZE
+    page = 0
+    while True:
+        pages = max((len(tasks) + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        page = min(page, pages - 1)
+        display_page(tasks, page, PAGE_SIZE)
+        print(f"Page {page + 1} of {pages} ({len(tasks)} tasks)")
+        command = input("[n]ext, [p]revious, [g]o to page, page [s]ize, [q]uit: ").strip().lower()
+        if command in ('n', ''):
+            if page + 1 >= pages:
+                break
+            page += 1
+        elif command == 'p':
+            page = max(page - 1, 0)
+        elif command == 'g':
+            try:
+                page = max(int(input(f"Page (1-{pages}): ")) - 1, 0)
+            except ValueError:
+                print("Please enter a valid number.")
+        elif command == 's':
+            try:
+                PAGE_SIZE = max(int(input("Tasks per page: ")), 1)
+                page = 0
+            except ValueError:
+                print("Please enter a valid number.")
+        elif command == 'q':
+            break
+        else:
+            print("Invalid option. Please try again.")
 
 def display_tasks(tasks):
     
     if not tasks:
         print("No tasks in the list.")
+    elif len(tasks) > PAGE_SIZE:
+        browse_tasks(tasks)
     else:
-        table = []
-        for idx, task in enumerate(tasks, start=1):
-            priority = task.get('priority', 'Low')
-            status = "✓" if task.get('completed', False) else "✗"
-            start_date = task.get('start_date', 'N/A')
-            completion_date = task.get('completion_date', 'N/A')
-            category = task.get('category', 'N/A')
-            reminder_date = task.get('reminder_date', 'N/A')
-            table.append([idx, task['name'], priority, status, start_date, completion_date, category, reminder_date])
-        
-        print(tabulate(table, headers=["No", "Task", "Priority", "Completed", "Start Date", "Completion Date", "Category", "Reminder Date"], tablefmt="grid"))
+        from tabulate import tabulate
+        print(tabulate(list(task_rows(tasks)), headers=[header for header, _ in TABLE_COLUMNS], tablefmt="grid"))
+
+def view_tasks(store, indexes):
+    # Filtered and/or sorted listing, read page by page from a sorted index.
+    # indexes holds the SortedIndex for each sort already asked for.
+    spec = input("Filter and sort (e.g. status=open category=Work priority=High sort=-reminder), Enter for all: ")
+    try:
+        filters, sort, reverse = parse_view(spec)
+    except ValueError as error:
+        print(error)
+        return
+    if not filters and sort == 'id' and not reverse:
+        display_tasks(store)
+        return
+    index = indexes.get(sort)
+    if index is None:
+        index = indexes[sort] = store.subscribe(SortedIndex(sort))
+    display_tasks(SortedView(store, index, reverse, **filters))
 
-def add_task(tasks):
+def add_task(store):
     
     task_name = input("Enter the Task: ")
     priority = input("Enter Priority (Low, Medium, High): ").capitalize()
     category = input("Enter Category (e.g., Work, Personal, Shopping): ")
     reminder_input = input("Set a Reminder Date (YYYY-MM-DD) or press Enter to skip: ")
     reminder_date = reminder_input if reminder_input else None
-    start_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    tasks.append({
-        'name': task_name,
-        'priority': priority,
-        'completed': False,
-        'start_date': start_date,
-        'completion_date': None,
-        'category': category,
-        'reminder_date': reminder_date
-    })
+    store.add(new_task(task_name, priority, category, reminder_date))
     print(f'Task "{task_name}" added successfully!')
 
-def remove_task(tasks):
+def remove_task(store):
     
-    display_tasks(tasks)
+    display_tasks(store)
     try:
-        task_num = int(input("Enter the task number to remove: "))
-        if 0 < task_num <= len(tasks):
-            removed_task = tasks.pop(task_num - 1)
+        task_id = int(input("Enter the task ID to remove: "))
+        if task_id in store:
+            removed_task = store.remove(task_id)
             print(f'Task "{removed_task["name"]}" removed successfully!')
         else:
-            print("Invalid task number.")
+            print("Invalid task ID.")
     except ValueError:
         print("Please enter a valid number.")
 
-def mark_task_completed(tasks):
+def mark_task_completed(store):
     
-    display_tasks(tasks)
+    display_tasks(store)
     try:
-        task_num = int(input("Enter the task number to mark as completed: "))
-        if 0 < task_num <= len(tasks):
-            tasks[task_num - 1]['completed'] = True
-            tasks[task_num - 1]['completion_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f'Task "{tasks[task_num - 1]["name"]}" marked as completed!')
+        task_id = int(input("Enter the task ID to mark as completed: "))
+        if task_id in store:
+            task = store.update(task_id, completed=True, completion_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            print(f'Task "{task["name"]}" marked as completed!')
         else:
-            print("Invalid task number.")
+            print("Invalid task ID.")
     except ValueError:
         print("Please enter a valid number.")
 
-def visualize_tasks(tasks):
-    completed_tasks = [task['name'] for task in tasks if task['completed']]
-    uncompleted_tasks = [task['name'] for task in tasks if not task['completed']]
-    
-    # Pie Chart
-    labels = ['Completed', 'Uncompleted']
-    sizes = [len(completed_tasks), len(uncompleted_tasks)]
-    colors = ['#F2C9A1', '#E6B69A']  # Nude color palette
-    explode = (0.1, 0)  # explode the 1st slice (Completed)
-
-    plt.figure(figsize=(14, 7))
-
-    # Pie Chart
-    plt.subplot(1, 2, 1)
-    wedges, texts, autotexts = plt.pie(
-        sizes, 
-        explode=explode, 
-        labels=labels, 
-        colors=colors, 
-        autopct='%1.1f%%', 
-        shadow=True, 
-        startangle=90, 
-        textprops={'fontsize': 14}
-    )
-    
-    # Enhance pie chart text
-    for text in texts:
-        text.set_fontsize(14)
-        text.set_color('#5D3A28')  # Darker color for labels
-
-    for autotext in autotexts:
-        autotext.set_color('white')  # White color for percentage
-        autotext.set_fontsize(12)
+def visualize_tasks(tasks, stats):
+    import matplotlib.pyplot as plt
+    from charts import draw_completion
+    fig = plt.figure(figsize=(14, 7))
+    draw_completion(fig, tasks, stats)
+    plt.show()
 
-    plt.axis('equal')  # Equal aspect ratio ensures the pie is drawn as a circle
-    plt.title("Task Completion Visualization", fontsize=16, fontweight='bold')
+def visualize_trends(tasks, stats, period='D'):
+    # Aggregated view for lists too long to chart task by task
+    import matplotlib.pyplot as plt
+    from charts import draw_trends
+    fig = plt.figure(figsize=(18, 6))
+    draw_trends(fig, tasks, stats, period)
+    plt.show()
 
-    # Line Chart
-    plt.subplot(1, 2, 2)
-    task_names = [task['name'] for task in tasks]
-    task_status = [1 if task['completed'] else 0 for task in tasks]  # 1 for completed, 0 for not completed
+def export_chart(store, stats, exporter, archive):
+    
+    chart = input("Chart to save ([c]ompletion, [d]aily trends, [w]eekly trends): ").strip().lower()
+    fmt = input("Image format (png or svg, default png): ").strip().lower() or 'png'
+    if fmt not in ('png', 'svg'):
+        print("Invalid format.")
+        return None
+    # Like the on-screen charts, these cover the archived tasks too
+    stats = with_archived(stats, archive, store)
+    if chart == 'c':
+        future = exporter.export('completion', store, stats, fmt)
+    elif chart in ('d', 'w'):
+        future = exporter.export('trends', store, stats, fmt, period=chart.upper(),
+                                 archived=archive.tasks(store))
+    else:
+        print("Invalid option. Please try again.")
+        return None
+    print("Rendering chart in the background...")
+    return future
 
-    # Use different colors for completed and uncompleted tasks
-    plt.plot(task_names, task_status, marker='o', linestyle='-', color='#D29F84', linewidth=2, markersize=8, label='Task Status')
+def report_exports(pending_exports):
+    # Tell the user about charts that finished rendering since the last menu
+    for future in [future for future in pending_exports if future.done()]:
+        pending_exports.remove(future)
+        try:
+            print(f"Chart saved to {future.result()}.")
+        except Exception as error:
+            print(f"Chart export failed: {error}")
 
-    # Add fill between completed and uncompleted tasks
-    plt.fill_between(task_names, task_status, color='#EFD8D3', alpha=0.3)
+def show_report(store, columns):
+    # columns is None until the first report; from then on it follows the store
+    if columns is None:
+        from analytics import TaskColumns
+        columns = store.subscribe(TaskColumns())
+    from analytics import report
+    print()
+    for line in report(columns):
+        print(line)
+    return columns
 
-    # Adding gridlines for better readability
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
+def search_tasks(store, index):
+    # The index is built on the first search and then follows the store
+    if index is None:
+        from search import SearchIndex
+        index = store.subscribe(SearchIndex())
+    query = input("Search for: ")
+    display_tasks([store.get(task_id) for task_id in sorted(index.search(query))])
+    return index
 
-    # Adding labels above the markers
-    for i, task in enumerate(tasks):
-        plt.text(i, task_status[i] + 0.05, task['name'], ha='center', fontsize=10, rotation=45)
+def undo_change(history):
+    label = history.undo()
+    print(f"Undid {label}." if label else "Nothing to undo.")
 
-    plt.yticks([0, 1], ['Not Completed', 'Completed'])
-    plt.xticks(rotation=45, ha='right')
-    plt.title("Task Completion Status", fontsize=16, fontweight='bold')
-    plt.xlabel("Tasks", fontsize=14)
-    plt.ylabel("Status", fontsize=14)
-    plt.legend(loc='upper left')
+def redo_change(history):
+    label = history.redo()
+    print(f"Redid {label}." if label else "Nothing to redo.")
 
-    plt.tight_layout()
-    plt.show()
+def show_archive(store, archive):
+    # Read from disk only now, not at startup
+    tasks = archive.tasks(store)
+    print(f"{len(tasks)} archived tasks.")
+    display_tasks(tasks)
 
-def check_reminders(tasks):
+def check_reminders(store, scheduler):
     
-    for task in tasks:
-        if task.get('reminder_date'):
-            reminder_date = datetime.strptime(task['reminder_date'], "%Y-%m-%d")
-            if reminder_date <= datetime.now() + timedelta(days=1) and not task['completed']:
-                print(f"Reminder: Task '{task['name']}' is due on {reminder_date.date()}.")
+    for task_id in scheduler.pop_due():
+        task = store.get(task_id)
+        print(f"Reminder: Task '{task['name']}' is due on {task['reminder_date']}.")
 
 def main():
     filename = 'todo_list.json'
-    tasks = load_tasks(filename)
+    store = load_tasks(open_storage(filename))
+    try:
+        menu(store, filename)
+    finally:
+        # However the menu ends (Exit, EOF, Ctrl+C, an error), the last
+        # changes are written
+        store.close()
+
+def menu(store, filename):
+    # Before anything follows the store, so nothing has to catch up
+    archive = Archive(filename)
+    archive.skip_ids(store)
+    archived = archive.archive_completed(store)
+    if archived:
+        print(f"Archived {archived} tasks completed more than {ARCHIVE_AFTER_DAYS:g} days ago.")
+    scheduler = store.subscribe(ReminderScheduler(lead=timedelta(days=1)))
+    stats = store.subscribe(TaskStats())
+    history = store.subscribe(History(store))
+    exporter = ChartExporter()
+    pending_exports = []
+    columns = None
+    search_index = None
+    sort_indexes = {}
 
     while True:
-        check_reminders(tasks) 
+        check_reminders(store, scheduler) 
+        report_exports(pending_exports)
         print("\nTo-Do List Menu:")
         print("1. View Tasks")
         print("2. Add Task")
@@ -181,36 +292,85 @@ def main():
         print("5. Visualize Task Completion")
         print("6. Export Tasks")
         print("7. Import Tasks")
-        print("8. Exit")
+        print("8. Save Chart to File")
+        print("9. Task Report")
+        print("10. Search Tasks")
+        print("11. Undo")
+        print("12. Redo")
+        print("13. Archived Tasks")
+        print("14. Exit")
         
         choice = input("Choose an option: ")
+        # Pick up changes made by the GUI or a batch run while we waited
+        store.refresh()
         
         if choice == '1':
-            display_tasks(tasks)
+            view_tasks(store, sort_indexes)
         elif choice == '2':
-            add_task(tasks)
-            save_tasks(filename, tasks)
+            add_task(store)
         elif choice == '3':
-            remove_task(tasks)
-            save_tasks(filename, tasks)
+            remove_task(store)
         elif choice == '4':
-            mark_task_completed(tasks)
-            save_tasks(filename, tasks)
+            mark_task_completed(store)
         elif choice == '5':
-            visualize_tasks(tasks)
+            from charts import SAMPLE_SIZE
+            default = 't' if len(store) <= SAMPLE_SIZE else 'd'
+            view = input(f"Chart by [t]ask, [d]ay or [w]eek (default {default}): ").strip().lower() or default
+            if view == 't':
+                visualize_tasks(store.list(), with_archived(stats, archive, store))
+            elif view in ('d', 'w'):
+                # Trends cover the archived tasks too
+                visualize_trends(store.list() + archive.tasks(store), with_archived(stats, archive, store),
+                                 view.upper())
+            else:
+                print("Invalid option. Please try again.")
         elif choice == '6':
             export_filename = input("Enter filename to export tasks (e.g., export_tasks.json): ")
-            export_tasks(export_filename, tasks)
+            export_tasks(export_filename, store)
         elif choice == '7':
             import_filename = input("Enter filename to import tasks (e.g., tasks.json): ")
-            imported_tasks = import_tasks(import_filename)
-            tasks.extend(imported_tasks)
-            save_tasks(filename, tasks)
+            tasks = import_tasks(import_filename)
+            if tasks is not None:
+                try:
+                    # One undo step for the whole import
+                    with history.group('import'):
+                        added, skipped = import_task_stream(store, tasks)
+                    print(f"Imported {added} tasks, skipped {skipped} already in the list.")
+                except (ValueError, OSError) as error:
+                    print(f"Could not read {import_filename}: {error}")
+                    if isinstance(error, ImportInterrupted) and error.added:
+                        undo = "; Undo removes them" if history.can_undo() else ""
+                        print(f"{error.added} tasks from before the error were imported{undo}.")
         elif choice == '8':
+            future = export_chart(store, stats, exporter, archive)
+            if future is not None:
+                pending_exports.append(future)
+        elif choice == '9':
+            columns = show_report(store, columns)
+        elif choice == '10':
+            search_index = search_tasks(store, search_index)
+        elif choice == '11':
+            undo_change(history)
+        elif choice == '12':
+            redo_change(history)
+        elif choice == '13':
+            show_archive(store, archive)
+        elif choice == '14':
             print("Exiting the program.")
+            exporter.close()
+            report_exports(pending_exports)
             break
         else:
             print("Invalid option. Please try again.")
 
 if __name__ == "__main__":
+    # --instrument / --profile FILE (or TODO_INSTRUMENT / TODO_PROFILE) time
+    # the hot paths; see instrument.py
+    import instrument
+    args = instrument.configure(sys.argv[1:])
+    instrument.install(globals())
+    if args:
+        # Batch mode for scripts; see batch.py
+        from batch import main as batch_main
+        sys.exit(batch_main(args))
     main()
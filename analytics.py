@@ -0,0 +1,189 @@
+import time
+from datetime import datetime
+import numpy as np
+from task import PRIORITIES
+
+# Reports over large task lists. TaskColumns keeps a column-per-field copy of
+# the tasks in NumPy arrays, so a query is a handful of array operations
+# instead of a Python loop over every task.
+
+# Priority -> code in the priority column; anything else is -1
+PRIORITY_CODES = {priority: code for code, priority in enumerate(PRIORITIES)}
+
+# Column name -> dtype. Dates are epoch seconds, NaN when missing.
+COLUMNS = {
+    'id': np.int64,
+    'priority': np.int8,
+    'category': np.int32,
+    'completed': np.bool_,
+    'start': np.float64,
+    'completion': np.float64,
+    'reminder': np.float64,
+}
+
+
+def start_of_today():
+    return datetime.combine(datetime.now().date(), datetime.min.time()).timestamp()
+
+
+def _timestamp(value):
+    return np.nan if value is None else value
+
+
+class TaskColumns:
+    # Store listener holding one NumPy array per field. Rows are added at the
+    # end; a removed task's row is filled with the last row, so every change
+    # costs O(1). Categories are stored as codes into self.categories.
+
+    def __init__(self, capacity=1024):
+        self.categories = []
+        self._category_codes = {}
+        self._rows = {}
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self._arrays = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    def _grow(self):
+        old = self._arrays
+        self._allocate(self.capacity * 2)
+        for name, array in old.items():
+            self._arrays[name][:self.size] = array[:self.size]
+
+    def column(self, name):
+        # The live part of a column (a view, not a copy)
+        return self._arrays[name][:self.size]
+
+    def _category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def _write_row(self, row, task):
+        arrays = self._arrays
+        arrays['id'][row] = task.id
+        arrays['priority'][row] = PRIORITY_CODES.get(task.priority, -1)
+        arrays['category'][row] = self._category_code(task.category)
+        arrays['completed'][row] = bool(task.completed)
+        arrays['start'][row] = _timestamp(task.start_ts)
+        arrays['completion'][row] = _timestamp(task.completion_ts)
+        arrays['reminder'][row] = _timestamp(task.reminder_ts)
+
+    def reset(self, tasks):
+        tasks = list(tasks)
+        self.categories = []
+        self._category_codes = {}
+        self.size = len(tasks)
+        self._allocate(max(1024, self.size * 2))
+        arrays = self._arrays
+        count = self.size
+        arrays['id'][:count] = np.fromiter((task.id for task in tasks), np.int64, count)
+        arrays['priority'][:count] = np.fromiter((PRIORITY_CODES.get(task.priority, -1) for task in tasks),
+                                                 np.int8, count)
+        arrays['category'][:count] = np.fromiter((self._category_code(task.category) for task in tasks),
+                                                 np.int32, count)
+        arrays['completed'][:count] = np.fromiter((bool(task.completed) for task in tasks), np.bool_, count)
+        for name, field in (('start', 'start_ts'), ('completion', 'completion_ts'), ('reminder', 'reminder_ts')):
+            arrays[name][:count] = np.fromiter((_timestamp(getattr(task, field)) for task in tasks),
+                                               np.float64, count)
+        self._rows = {task.id: row for row, task in enumerate(tasks)}
+
+    def on_add(self, task):
+        if self.size == self.capacity:
+            self._grow()
+        self._rows[task.id] = self.size
+        self._write_row(self.size, task)
+        self.size += 1
+
+    def on_update(self, task, old):
+        self._write_row(self._rows[task.id], task)
+
+    def on_remove(self, task):
+        row = self._rows.pop(task.id)
+        last = self.size - 1
+        if row != last:
+            for array in self._arrays.values():
+                array[row] = array[last]
+            self._rows[int(self._arrays['id'][row])] = row
+        self.size = last
+
+    def __len__(self):
+        return self.size
+
+    def _mask(self, category=None, priority=None, completed=None):
+        mask = np.ones(self.size, dtype=bool)
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= self.column('category') == code
+        if priority is not None:
+            mask &= self.column('priority') == PRIORITY_CODES.get(priority, -1)
+        if completed is not None:
+            mask &= self.column('completed') == bool(completed)
+        return mask
+
+    def count(self, category=None, priority=None, completed=None):
+        return int(np.count_nonzero(self._mask(category, priority, completed)))
+
+    def completion_times(self):
+        # (category codes, seconds from start to completion) of completed tasks
+        durations = self.column('completion') - self.column('start')
+        done = self.column('completed') & ~np.isnan(durations)
+        return self.column('category')[done], durations[done]
+
+    def median_completion_time(self):
+        # Category -> median seconds from start to completion
+        codes, durations = self.completion_times()
+        if not len(codes):
+            return {}
+        order = np.argsort(codes, kind='stable')
+        codes, durations = codes[order], durations[order]
+        present, starts = np.unique(codes, return_index=True)
+        groups = np.split(durations, starts[1:])
+        return {self.categories[code]: float(np.median(group)) for code, group in zip(present, groups)}
+
+    def overdue(self, priority=None, category=None, before=None):
+        # Ids of open tasks whose reminder date is before `before` (epoch
+        # seconds; the start of today by default)
+        before = start_of_today() if before is None else before
+        mask = self._mask(category, priority, completed=False)
+        # NaN (no reminder) compares False
+        mask &= self.column('reminder') < before
+        return self.column('id')[mask]
+
+    def overdue_count(self, priority=None, category=None, before=None):
+        return len(self.overdue(priority, category, before))
+
+    def completed_since(self, since):
+        # Ids of tasks completed at or after since (epoch seconds)
+        return self.column('id')[self.column('completion') >= since]
+
+
+def report(columns, now=None):
+    # Lines of the summary printed by the CLI's "Task Report"
+    now = time.time() if now is None else now
+    lines = [f"Tasks: {len(columns)} ({columns.count(completed=True)} completed)"]
+    medians = columns.median_completion_time()
+    if medians:
+        lines.append("Median time to complete:")
+        for category, seconds in sorted(medians.items(), key=lambda item: str(item[0])):
+            lines.append(f"  {category}: {format_duration(seconds)}")
+    else:
+        lines.append("No completed tasks with start and completion dates yet.")
+    for priority in reversed(PRIORITIES):
+        lines.append(f"Overdue {priority.lower()} priority: {columns.overdue_count(priority)}")
+    lines.append(f"Completed in the last 7 days: {len(columns.completed_since(now - 7 * 86400))}")
+    return lines
+
+
+def format_duration(seconds):
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
@@ -0,0 +1,141 @@
+import gzip
+import json
+import os
+import time
+from storage import SharedFile, atomic_write, file_signature
+from task import Task
+
+# Archive tier for finished work. Tasks completed more than
+# TODO_ARCHIVE_DAYS days ago (30 by default, "off" to keep everything) move
+# out of the task file into gzipped JSON Lines segments, so loading, saving
+# and listing only carry active work. The archive is read only when asked
+# for: the archived task list and the trend charts.
+#
+# For filename='todo_list.json' the segments are
+#   todo_list.archive/000001.jsonl.gz, 000002.jsonl.gz, ...
+# one per archiving run. Each is written whole and renamed into place before
+# its tasks leave the store, so a crash in between leaves a task in both
+# places, never in neither; readers prefer the copy in the store.
+
+_DAYS = os.environ.get('TODO_ARCHIVE_DAYS', '30')
+ARCHIVE_AFTER_DAYS = None if _DAYS.lower() in ('', 'off', 'never') else float(_DAYS)
+
+SEGMENT_SUFFIX = '.jsonl.gz'
+
+# Highest task id in the archive, so a new task never reuses one
+MAX_ID_FILE = 'max_id'
+
+
+def archivable(task, cutoff):
+    # Completed before cutoff (epoch seconds)
+    return bool(task.completed) and task.completion_ts is not None and task.completion_ts < cutoff
+
+
+class Archive:
+
+    def __init__(self, filename):
+        base, _ = os.path.splitext(filename)
+        self.directory = base + '.archive'
+        # Serializes segment numbering between processes
+        self.shared = SharedFile(self.directory)
+        self._tasks = None
+        self._signature = None
+
+    def segments(self):
+        # Segment paths, oldest first
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name)
+                for name in sorted(name for name in names if name.endswith(SEGMENT_SUFFIX))]
+
+    def archive_completed(self, store, days=ARCHIVE_AFTER_DAYS, now=None):
+        # Move the tasks completed more than days ago from store into a new
+        # segment. Returns how many moved.
+        if days is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - days * 86400
+        old = [task for task in store if archivable(task, cutoff)]
+        if not old:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        with self.shared.locked():
+            segments = self.segments()
+            number = int(os.path.basename(segments[-1])[:-len(SEGMENT_SUFFIX)]) + 1 if segments else 1
+            path = os.path.join(self.directory, f"{number:06d}{SEGMENT_SUFFIX}")
+            with atomic_write(path, 'wb') as file:
+                with gzip.GzipFile(fileobj=file, mode='wb') as segment:
+                    for task in old:
+                        segment.write(json.dumps(task.to_dict()).encode() + b'\n')
+            self._write_max_id(max(self._read_max_id() or 0, max(task.id for task in old)))
+        with store.batch():
+            for task in old:
+                store.remove(task.id)
+        self._tasks = None
+        return len(old)
+
+    def _read_max_id(self):
+        try:
+            with open(os.path.join(self.directory, MAX_ID_FILE)) as file:
+                return int(file.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_max_id(self, max_id):
+        with atomic_write(os.path.join(self.directory, MAX_ID_FILE)) as file:
+            file.write(str(max_id))
+
+    def max_id(self):
+        # Highest archived task id (0 for none). Archives from before the
+        # max_id file are read once to make it.
+        max_id = self._read_max_id()
+        if max_id is None:
+            max_id = max((task.id for task in self.iter_tasks() if task.id is not None), default=0)
+            if max_id:
+                with self.shared.locked():
+                    self._write_max_id(max(self._read_max_id() or 0, max_id))
+        return max_id
+
+    def skip_ids(self, store):
+        # Keep store from giving a new task the id of an archived one, even
+        # if the shared id counter was lost
+        store.skip_ids(self.max_id())
+
+    def iter_tasks(self):
+        # Archived tasks one at a time, oldest segment first
+        for path in self.segments():
+            try:
+                file = gzip.open(path, 'rt')
+            except FileNotFoundError:
+                continue
+            with file:
+                for line in file:
+                    yield Task.from_dict(json.loads(line))
+
+    def _signature_now(self):
+        return tuple(file_signature(path) for path in self.segments())
+
+    def tasks(self, store=None):
+        # All archived tasks, read once and kept until a segment is added.
+        # With store, tasks also still in it (see above) are left out.
+        signature = self._signature_now()
+        if self._tasks is None or signature != self._signature:
+            # A task archived twice (two processes at once) is kept once
+            self._tasks = list({task.id: task for task in self.iter_tasks()}.values())
+            self._signature = signature
+        if store is None:
+            return self._tasks
+        return [task for task in self._tasks if task.id not in store]
+
+    def __len__(self):
+        return len(self.tasks())
+
+
+def with_archived(stats, archive, store):
+    # A copy of stats (a TaskStats) that also counts the archived tasks, for
+    # charts of all work rather than just the active list
+    combined = stats.copy()
+    for task in archive.tasks(store):
+        combined.on_add(task)
+    return combined
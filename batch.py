@@ -0,0 +1,223 @@
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from archive import Archive
+from instrument import timer
+from storage import open_storage
+from task_store import TaskStore, new_task
+from task_io import convert_task_file, import_task_stream, iter_task_file, write_task_file
+
+# Non-interactive commands for scripts, e.g.
+#
+#   python FINAL.py add --from-csv tasks.csv
+#   python FINAL.py add --name "Pay rent" --priority High --category Home
+#   python FINAL.py complete --ids 3,4,5
+#   python FINAL.py remove --where category=Work --where completed=true
+#   python FINAL.py apply < changes.jsonl
+#   python FINAL.py import other_system.jsonl
+#   python FINAL.py export backup.jsonl
+#   python FINAL.py convert todo_list.json todo_list.bin
+#
+# Every change of a run is made in memory and written to storage once, at
+# the end. If anything fails, nothing is written.
+
+# Fields that --where can filter on
+WHERE_FIELDS = ('category', 'priority', 'completed')
+
+
+def parse_ids(text):
+    try:
+        return [int(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid task id list: {text}")
+
+
+def parse_where(text):
+    field, sep, value = text.partition('=')
+    if not sep or field not in WHERE_FIELDS:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE with FIELD one of {', '.join(WHERE_FIELDS)}")
+    if field == 'completed':
+        if value.lower() not in ('true', 'false'):
+            raise argparse.ArgumentTypeError("completed must be true or false")
+        return field, value.lower() == 'true'
+    if field == 'priority':
+        value = value.capitalize()
+    return field, value
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def read_csv_tasks(filename):
+    # CSV with a header row: name, priority, category and optionally reminder_date
+    with open(filename, newline='') as file:
+        for row in csv.DictReader(file):
+            yield new_task(row['name'], (row.get('priority') or 'Low').capitalize(),
+                           row.get('category') or '', row.get('reminder_date') or None)
+
+
+def select(store, ids=None, where=None):
+    # Ids of the tasks picked by --ids and/or --where
+    if ids:
+        missing = [task_id for task_id in ids if task_id not in store]
+        if missing:
+            raise SystemExit(f"Unknown task id(s): {', '.join(map(str, missing))}")
+        selected = ids
+    else:
+        selected = None
+    if where:
+        matches = [task['id'] for task in store.find(**dict(where))]
+        if selected is not None:
+            matched = set(matches)
+            matches = [task_id for task_id in selected if task_id in matched]
+        selected = matches
+    if selected is None:
+        raise SystemExit("Give --ids and/or --where to choose tasks.")
+    return selected
+
+
+def run_add(store, args):
+    if args.from_csv:
+        tasks = read_csv_tasks(args.from_csv)
+    elif args.name:
+        tasks = [new_task(args.name, args.priority.capitalize(), args.category, args.reminder)]
+    else:
+        raise SystemExit("Give --from-csv FILE or --name.")
+    count = 0
+    for task in tasks:
+        store.add(task)
+        count += 1
+    return f"Added {count} tasks."
+
+
+def run_complete(store, args):
+    completion_date = now()
+    selected = select(store, args.ids, args.where)
+    for task_id in selected:
+        store.update(task_id, completed=True, completion_date=completion_date)
+    return f"Marked {len(selected)} tasks as completed."
+
+
+def run_remove(store, args):
+    selected = select(store, args.ids, args.where)
+    for task_id in selected:
+        store.remove(task_id)
+    return f"Removed {len(selected)} tasks."
+
+
+def run_apply(store, args):
+    # One JSON object per line:
+    #   {"op": "add", "task": {"name": ..., "priority": ..., "category": ...}}
+    #   {"op": "complete", "id": 3}
+    #   {"op": "update", "id": 3, "fields": {"priority": "High"}}
+    #   {"op": "remove", "id": 3}
+    counts = {}
+    for line_number, line in enumerate(args.input, start=1):
+        if not line.strip():
+            continue
+        try:
+            change = json.loads(line)
+            op = change['op']
+            if op != 'add' and change['id'] not in store:
+                raise ValueError(f"unknown task id {change['id']}")
+            if op == 'add':
+                task = change['task']
+                store.add(new_task(task['name'], task.get('priority', 'Low'), task.get('category', ''),
+                                   task.get('reminder_date')))
+            elif op == 'complete':
+                store.update(change['id'], completed=True, completion_date=now())
+            elif op == 'update':
+                fields = {key: value for key, value in change['fields'].items() if key != 'id'}
+                store.update(change['id'], **fields)
+            elif op == 'remove':
+                store.remove(change['id'])
+            else:
+                raise ValueError(f"unknown op {op!r}")
+        except (ValueError, KeyError, TypeError) as error:
+            raise SystemExit(f"Line {line_number}: {error}")
+        counts[op] = counts.get(op, 0) + 1
+    summary = ', '.join(f"{op} {count}" for op, count in sorted(counts.items()))
+    return f"Applied {sum(counts.values())} changes ({summary or 'none'})."
+
+
+def run_import(store, args):
+    added, skipped = import_task_stream(store, iter_task_file(args.source))
+    return f"Imported {added} tasks, skipped {skipped} already in the list."
+
+
+def run_export(store, args):
+    count = write_task_file(args.target, store)
+    return f"Exported {count} tasks to {args.target}."
+
+
+def run_convert(store, args):
+    count = convert_task_file(args.source, args.target)
+    return f"Converted {count} tasks from {args.source} to {args.target}."
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='FINAL.py', description="Batch operations on the to-do list.")
+    parser.add_argument('--file', default='todo_list.json', help="task file (default todo_list.json)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add tasks")
+    add.add_argument('--from-csv', metavar='FILE', help="CSV with name, priority, category, reminder_date columns")
+    add.add_argument('--name')
+    add.add_argument('--priority', default='Low')
+    add.add_argument('--category', default='')
+    add.add_argument('--reminder', metavar='YYYY-MM-DD')
+    add.set_defaults(run=run_add)
+
+    for name, run, help_text in (('complete', run_complete, "mark tasks as completed"),
+                                 ('remove', run_remove, "remove tasks")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--ids', type=parse_ids, metavar='1,2,3')
+        command.add_argument('--where', type=parse_where, action='append', metavar='FIELD=VALUE')
+        command.set_defaults(run=run)
+
+    apply = commands.add_parser('apply', help="apply JSON-lines changes read from stdin")
+    apply.add_argument('input', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
+                       help="file to read instead of stdin")
+    apply.set_defaults(run=run_apply)
+
+    import_ = commands.add_parser('import', help="merge tasks from a JSON, JSON Lines or binary file, skipping duplicates")
+    import_.add_argument('source')
+    import_.set_defaults(run=run_import)
+
+    export = commands.add_parser('export', help="write all tasks to a JSON, JSON Lines (.jsonl) or binary (.bin) file")
+    export.add_argument('target')
+    export.set_defaults(run=run_export)
+
+    convert = commands.add_parser('convert', help="convert a task file between JSON, JSON Lines and binary (.bin)")
+    convert.add_argument('source')
+    convert.add_argument('target')
+    convert.set_defaults(run=run_convert)
+    return parser
+
+
+def main(argv):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    fields = [field for field, _ in getattr(args, 'where', None) or []]
+    repeated = sorted({field for field in fields if fields.count(field) > 1})
+    if repeated:
+        # A task has one value per field, so these could never all match
+        parser.error(f"--where gives {', '.join(repeated)} more than once")
+    if args.command == 'convert':
+        # File to file; the task store isn't opened
+        with timer(f"batch {args.command}"):
+            message = args.run(None, args)
+        print(message)
+        return 0
+    store = TaskStore(open_storage(args.file)).load()
+    Archive(args.file).skip_ids(store)
+    try:
+        with timer(f"batch {args.command}"), store.batch():
+            message = args.run(store, args)
+    finally:
+        store.close()
+    print(message)
+    return 0
@@ -0,0 +1,81 @@
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Synthetic task lists in the todo_list.json schema, for benchmarks. The mix
+# follows the real file: a name, a priority, a category, start and
+# completion dates, an optional reminder date and, on some tasks, the
+# "ongoing" flag. The same seed always gives the same tasks.
+#
+#   python -m benchmarks.dataset 100000 big_todo_list.json
+
+VERBS = ['Buy', 'Call', 'Finish', 'Review', 'Plan', 'Fix', 'Clean', 'Write', 'Book', 'Pay',
+         'Email', 'Read', 'Prepare', 'Update', 'Order', 'Schedule', 'Send', 'Organize']
+OBJECTS = ['groceries', 'project report', 'mom', 'dentist appointment', 'rent', 'bike', 'garage',
+           'slides', 'invoice', 'tax return', 'presentation', 'birthday gift', 'car service',
+           'team meeting', 'blog post', 'flight tickets', 'budget', 'backup', 'newsletter']
+CATEGORIES = ['Work', 'Personal', 'Shopping', 'Home', 'Health', 'Finance', 'Travel']
+PRIORITY_WEIGHTS = {'Low': 5, 'Medium': 3, 'High': 2}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def generate_tasks(count, seed=0, end=None, days=365):
+    # Yield count task dicts with start dates spread over the `days` days
+    # before end (now by default)
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(microsecond=0)
+    first = end - timedelta(days=days)
+    priorities = list(PRIORITY_WEIGHTS)
+    weights = list(PRIORITY_WEIGHTS.values())
+    for _ in range(count):
+        start = first + timedelta(seconds=rng.randrange(days * 86400))
+        completed = rng.random() < 0.6
+        completion = None
+        if completed:
+            # Most tasks get done within days; a few drag on for months
+            completion = min(start + timedelta(seconds=int(rng.lognormvariate(11, 1.5))), end)
+        task = {
+            'name': f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}",
+            'priority': rng.choices(priorities, weights)[0],
+            'completed': completed,
+        }
+        if rng.random() < 0.5:
+            # Only some tasks in todo_list.json carry the field
+            task['ongoing'] = not completed and rng.random() < 0.7
+        task['start_date'] = start.strftime(DATE_FORMAT)
+        task['completion_date'] = completion.strftime(DATE_FORMAT) if completion else None
+        task['category'] = rng.choice(CATEGORIES)
+        reminder = None
+        if rng.random() < 0.6:
+            reminder = (start + timedelta(days=rng.randint(-2, 30))).strftime("%Y-%m-%d")
+        task['reminder_date'] = reminder
+        yield task
+
+
+def write_dataset(filename, count, seed=0):
+    # Write a todo_list.json style file one task at a time
+    with open(filename, 'w') as file:
+        file.write('[')
+        for position, task in enumerate(generate_tasks(count, seed)):
+            file.write(',\n    ' if position else '\n    ')
+            file.write(json.dumps(task, indent=4).replace('\n', '\n    '))
+        file.write('\n]' if count else ']')
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic todo_list.json.")
+    parser.add_argument('count', type=int)
+    parser.add_argument('filename')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_dataset(args.filename, args.count, args.seed)
+    print(f"Wrote {args.count} tasks to {args.filename}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
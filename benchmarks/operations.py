@@ -0,0 +1,374 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Timings of the task store's main operations on synthetic task lists (see
+# benchmarks/dataset.py), per list size and storage backend. Every operation
+# is timed `--repeat` times for latency percentiles; a second, separate pass
+# runs it once under tracemalloc for its peak memory, so tracing doesn't slow
+# down the timed runs. Results go to a JSON file; give an earlier one with
+# --compare to see what got slower.
+#
+#   python -m benchmarks.operations
+#   python -m benchmarks.operations --sizes 1000,10000,100000,1000000 --backends journal
+#   python -m benchmarks.operations --compare benchmarks/results/before.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Charts are drawn without a window
+os.environ.setdefault('MPLBACKEND', 'Agg')
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import FINAL
+from storage import open_storage
+from reminders import ReminderScheduler
+from stats import TaskStats
+from task_store import new_task
+from benchmarks.dataset import write_dataset
+
+DEFAULT_SIZES = '1000,10000,100000'
+
+
+class Probe:
+    # Times each `with probe:` block; with trace_memory set, also keeps the
+    # highest memory the blocks allocated on top of what was already in use
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.samples = []
+        self.peak = 0
+
+    def __enter__(self):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self._start)
+        if self.trace_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1] - self._base)
+
+
+@contextlib.contextmanager
+def quiet():
+    # Swallow what the menu functions print; answer "q" to the pager
+    with contextlib.redirect_stdout(io.StringIO()), mock.patch('builtins.input', return_value='q'):
+        yield
+
+
+class Workload:
+    # One task file of a given size for one backend, in its own directory
+
+    def __init__(self, directory, dataset, size, backend, calls):
+        self.size = size
+        self.backend = backend
+        self.calls = calls
+        self.filename = os.path.join(directory, 'todo_list.json')
+        shutil.copyfile(dataset, self.filename)
+        # The first load converts todo_list.json to the backend's own files;
+        # do that here so the timed loads read what a running app would
+        self.open(commit_window=0).close()
+
+    def open(self, commit_window=0):
+        return FINAL.load_tasks(open_storage(self.filename, self.backend, commit_window))
+
+
+# Each benchmark runs its operation `repeat` times inside the probe and
+# returns how many tasks (or calls) one run handles, for the throughput
+
+def bench_load_tasks(work, probe, repeat):
+    for _ in range(repeat):
+        storage = open_storage(work.filename, work.backend, 0)
+        with probe:
+            store = FINAL.load_tasks(storage)
+        store.close()
+    return work.size
+
+
+def bench_save_tasks(work, probe, repeat):
+    store = work.open()
+    tasks = store.list()
+    for _ in range(repeat):
+        with probe:
+            store.replace(tasks)
+    store.close()
+    return work.size
+
+
+def bench_display_tasks(work, probe, repeat):
+    # First page of the paged listing, as "View Tasks" shows it
+    store = work.open()
+    with quiet():
+        for _ in range(repeat):
+            with probe:
+                FINAL.display_tasks(store)
+    store.close()
+    return min(work.size, FINAL.PAGE_SIZE)
+
+
+def bench_display_last_page(work, probe, repeat):
+    store = work.open()
+    last = max(len(store) - 1, 0) // FINAL.PAGE_SIZE
+    with quiet():
+        for _ in range(repeat):
+            with probe:
+                FINAL.display_page(store, last, FINAL.PAGE_SIZE)
+    store.close()
+    return min(work.size, FINAL.PAGE_SIZE)
+
+
+def bench_check_reminders(work, probe, repeat):
+    # Scheduling every reminder and the first check, which reports all the
+    # reminders already due; the menu does this once at startup
+    store = work.open()
+    with quiet():
+        for _ in range(repeat):
+            scheduler = ReminderScheduler(lead=timedelta(days=1))
+            with probe:
+                scheduler.reset(store)
+                FINAL.check_reminders(store, scheduler)
+    store.close()
+    return work.size
+
+
+def bench_check_reminders_idle(work, probe, repeat):
+    # The check before every menu, when nothing new is due
+    store = work.open()
+    scheduler = store.subscribe(ReminderScheduler(lead=timedelta(days=1)))
+    with quiet():
+        FINAL.check_reminders(store, scheduler)
+        for _ in range(repeat):
+            with probe:
+                FINAL.check_reminders(store, scheduler)
+    store.close()
+    return 1
+
+
+def _bench_chart(work, probe, repeat, draw):
+    import matplotlib.pyplot as plt
+    store = work.open()
+    stats = store.subscribe(TaskStats())
+    with warnings.catch_warnings():
+        # plt.show() on the Agg backend warns that it can't show anything
+        warnings.simplefilter('ignore', UserWarning)
+        for _ in range(repeat):
+            with probe:
+                draw(store.list(), stats)
+            plt.close('all')
+    store.close()
+    return work.size
+
+
+def bench_visualize_tasks(work, probe, repeat):
+    return _bench_chart(work, probe, repeat, FINAL.visualize_tasks)
+
+
+def bench_visualize_trends(work, probe, repeat):
+    return _bench_chart(work, probe, repeat, FINAL.visualize_trends)
+
+
+def bench_add_task(work, probe, repeat):
+    # Single adds through the default commit window, like the menu and GUI;
+    # every call is one sample
+    store = work.open(commit_window=None)
+    for number in range(work.calls * repeat):
+        task = new_task(f"Benchmark task {number}", 'Medium', 'Work', '2030-01-01')
+        with probe:
+            store.add(task)
+    store.close()
+    return 1
+
+
+def bench_complete_task(work, probe, repeat):
+    store = work.open(commit_window=None)
+    open_ids = [task.id for task in store if not task.completed]
+    random.Random(0).shuffle(open_ids)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for task_id in open_ids[:work.calls * repeat]:
+        with probe:
+            store.update(task_id, completed=True, completion_date=now)
+    store.close()
+    return 1
+
+
+BENCHMARKS = {
+    'load_tasks': bench_load_tasks,
+    'save_tasks': bench_save_tasks,
+    'display_tasks': bench_display_tasks,
+    'display_last_page': bench_display_last_page,
+    'check_reminders': bench_check_reminders,
+    'check_reminders_idle': bench_check_reminders_idle,
+    'visualize_tasks': bench_visualize_tasks,
+    'visualize_trends': bench_visualize_trends,
+    'add_task': bench_add_task,
+    'complete_task': bench_complete_task,
+}
+
+
+def percentile(samples, fraction):
+    # Linear interpolation between the closest ranks
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(samples, items):
+    median = percentile(samples, 0.5)
+    return {
+        'runs': len(samples),
+        'p50_ms': median * 1000,
+        'p90_ms': percentile(samples, 0.9) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples) * 1000,
+        # Tasks per second for whole-list operations, calls per second for
+        # single-task ones
+        'throughput_per_s': items / median if median else None,
+    }
+
+
+def run(work, name, repeat, trace_memory):
+    bench = BENCHMARKS[name]
+    probe = Probe()
+    items = bench(work, probe, repeat)
+    result = {'size': work.size, 'backend': work.backend, 'operation': name}
+    result.update(summarize(probe.samples, items))
+    result['peak_memory_bytes'] = None
+    if trace_memory:
+        probe = Probe(trace_memory=True)
+        tracemalloc.start()
+        try:
+            bench(work, probe, 1)
+        finally:
+            tracemalloc.stop()
+        result['peak_memory_bytes'] = probe.peak
+    return result
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def format_result(result):
+    peak = result['peak_memory_bytes']
+    memory = '' if peak is None else f"  peak {peak / 2 ** 20:8.1f} MiB"
+    throughput = result['throughput_per_s']
+    rate = '' if throughput is None else f"  {throughput:12,.0f}/s"
+    return (f"{result['size']:>8} {result['backend']:<8} {result['operation']:<21}"
+            f" p50 {result['p50_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms"
+            f"  p99 {result['p99_ms']:9.2f} ms  max {result['max_ms']:9.2f} ms{rate}{memory}")
+
+
+def compare(results, baseline, threshold):
+    # Print the p50 change against an earlier run; return the regressions
+    # (slower by more than threshold, a fraction)
+    before = {(item['size'], item['backend'], item['operation']): item for item in baseline['results']}
+    regressions = []
+    print(f"\nChange in p50 against {baseline['meta'].get('commit') or 'the baseline'}:")
+    for result in results:
+        old = before.get((result['size'], result['backend'], result['operation']))
+        if old is None or not old['p50_ms']:
+            continue
+        change = result['p50_ms'] / old['p50_ms'] - 1
+        slower = change > threshold
+        if slower:
+            regressions.append(result)
+        print(f"{result['size']:>8} {result['backend']:<8} {result['operation']:<21}"
+              f" {old['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms ({change:+.0%})"
+              f"{'  SLOWER' if slower else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the task store operations on synthetic task lists.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"comma-separated task counts (default {DEFAULT_SIZES})")
+    parser.add_argument('--backends', default='json,journal,sqlite,binary',
+                        help="comma-separated storage backends (default json,journal,sqlite,binary)")
+    parser.add_argument('--operations', default=','.join(BENCHMARKS),
+                        help="comma-separated operations (default all)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per operation (default 5)")
+    parser.add_argument('--calls', type=int, default=200,
+                        help="calls per run for the single-task operations (default 200)")
+    parser.add_argument('--seed', type=int, default=0, help="dataset seed (default 0)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<time>.json)")
+    parser.add_argument('--compare', metavar='RESULTS', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="p50 slowdown counted as a regression with --compare (default 0.2)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    backends = args.backends.split(',')
+    operations = args.operations.split(',')
+    for name in operations:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown operation {name!r}; choose from {', '.join(BENCHMARKS)}")
+
+    started = datetime.now()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            dataset = write_dataset(os.path.join(directory, f'tasks-{size}.json'), size, args.seed)
+            for backend in backends:
+                for name in operations:
+                    # A fresh copy for every operation, so adds and saves
+                    # don't change what the next one measures
+                    work_dir = tempfile.mkdtemp(dir=directory)
+                    work = Workload(work_dir, dataset, size, backend, args.calls)
+                    result = run(work, name, args.repeat, not args.no_memory)
+                    shutil.rmtree(work_dir)
+                    results.append(result)
+                    print(format_result(result), flush=True)
+            os.remove(dataset)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, started.strftime('%Y%m%d-%H%M%S') + '.json')
+    meta = {
+        'started': started.isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': sizes,
+        'backends': backends,
+        'repeat': args.repeat,
+        'calls': args.calls,
+        'seed': args.seed,
+    }
+    with open(output, 'w') as file:
+        json.dump({'meta': meta, 'results': results}, file, indent=2)
+    print(f"Results written to {output}.")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start check for the two entry points. Each one is imported in a fresh
+# interpreter with `python -X importtime` and the cumulative import time of
+# the module is compared against a budget. Heavy libraries that should only
+# load on first use must not show up at all.
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --runs 10 --budget FINAL=100
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point module -> import budget in milliseconds
+BUDGETS = {
+    'FINAL': 100,
+    'APP': 150,
+}
+
+LAZY_MODULES = ('matplotlib', 'numpy', 'tabulate')
+
+
+def import_times(module):
+    # Import the module in a new interpreter; return {module: cumulative us}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module, runs):
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        times = import_times(module)
+        samples.append(times[module] / 1000)
+        loaded.update(name for name in times if name.split('.')[0] in LAZY_MODULES)
+    return samples, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of FINAL.py and APP.py.")
+    parser.add_argument('--runs', type=int, default=5, help="imports per entry point (default 5)")
+    parser.add_argument('--budget', action='append', default=[], metavar='MODULE=MS',
+                        help="override a budget, e.g. FINAL=100")
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS)
+    for item in args.budget:
+        module, _, ms = item.partition('=')
+        budgets[module] = float(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        samples, loaded = measure(module, args.runs)
+        median = statistics.median(samples)
+        ok = median <= budget and not loaded
+        failed = failed or not ok
+        print(f"{module}: median {median:.1f} ms, best {min(samples):.1f} ms, budget {budget} ms "
+              f"-> {'OK' if ok else 'OVER BUDGET'}")
+        if loaded:
+            print(f"  imported at startup: {', '.join(loaded)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import json
+import mmap
+import os
+import struct
+from task import PRIORITIES, Task, parse_timestamp
+
+# Binary task file format. A 64-byte header, one fixed-width 64-byte record
+# per task, then a heap of UTF-8 strings the records point into:
+#
+#   header  magic, version, record size, task count, heap offset, heap size
+#   record  id, start/completion/reminder date, name, category and extra as
+#           (heap offset, length), priority code, flags
+#
+# Dates are packed as YYYYMMDDHHMMSS (or YYYYMMDD for a date without a time),
+# so they come back exactly as written; 0 means no date. Repeated strings
+# (categories, mostly) are stored once. Anything that doesn't fit a fixed
+# field (an unknown priority, a date in another format, keys outside the
+# schema) goes into the task's "extra" JSON object on the heap.
+#
+# BinaryTaskFile reads the file through mmap: opening costs the same for any
+# size, and a task is only decoded, and its page only read, when asked for.
+
+MAGIC = b'TODOBIN1'
+VERSION = 1
+
+# magic, version, record size, count, heap offset, heap size
+HEADER = struct.Struct('<8sIIQQQ24x')
+# id, start, completion, reminder, name, category, extra (offset, length
+# each), priority, flags
+RECORD = struct.Struct('<qqqqIIIIIIbB6x')
+
+# Heap length of a missing string
+NO_STRING = 0xFFFFFFFF
+
+PRIORITY_CODES = {priority: code for code, priority in enumerate(PRIORITIES)}
+NO_PRIORITY = -1
+# The priority is in extra
+OTHER_PRIORITY = -2
+
+COMPLETED = 1
+HAS_ONGOING = 2
+ONGOING = 4
+
+def pack_date(value):
+    # "YYYY-MM-DD HH:MM:SS" -> YYYYMMDDHHMMSS, "YYYY-MM-DD" -> YYYYMMDD,
+    # None -> 0; None for anything else
+    if value is None:
+        return 0
+    if not isinstance(value, str):
+        return None
+    length = len(value)
+    if length == 19:
+        if value[10] != ' ' or value[13] != ':' or value[16] != ':':
+            return None
+    elif length != 10:
+        return None
+    if value[4] != '-' or value[7] != '-':
+        return None
+    digits = value.replace('-', '').replace(' ', '').replace(':', '')
+    # A separator anywhere else leaves too few digits
+    if len(digits) != length - (5 if length == 19 else 2) or not (digits.isascii() and digits.isdigit()):
+        return None
+    return int(digits) or None
+
+
+def unpack_date(packed):
+    if not packed:
+        return None
+    if packed >= 10 ** 9:
+        digits = f"{packed:014d}"
+        return (f"{digits[:4]}-{digits[4:6]}-{digits[6:8]} "
+                f"{digits[8:10]}:{digits[10:12]}:{digits[12:]}")
+    digits = f"{packed:08d}"
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def _parsed_date(packed):
+    # (text, epoch seconds) of a packed date
+    text = unpack_date(packed)
+    return text, parse_timestamp(text)
+
+
+def is_binary_file(filename):
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def write_binary(file, tasks):
+    # Write tasks (Tasks or dicts) to a binary file object; returns the count
+    heap = bytearray()
+    strings = {}
+
+    def heap_ref(text):
+        if text is None:
+            return 0, NO_STRING
+        ref = strings.get(text)
+        if ref is None:
+            data = text.encode('utf-8')
+            ref = strings[text] = (len(heap), len(data))
+            heap.extend(data)
+        return ref
+
+    records = bytearray()
+    count = 0
+    for task in tasks:
+        records += _encode(Task.from_dict(task), heap_ref)
+        count += 1
+    heap_offset = HEADER.size + count * RECORD.size
+    file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count, heap_offset, len(heap)))
+    file.write(records)
+    file.write(heap)
+    return count
+
+
+def _encode(task, heap_ref):
+    extra = dict(task.extra) if task.extra else {}
+    start = pack_date(task.start_date)
+    if start is None:
+        extra['start_date'] = task.start_date
+        start = 0
+    completion = pack_date(task.completion_date)
+    if completion is None:
+        extra['completion_date'] = task.completion_date
+        completion = 0
+    reminder = pack_date(task.reminder_date)
+    if reminder is None:
+        extra['reminder_date'] = task.reminder_date
+        reminder = 0
+
+    name = task.name
+    if name is not None and not isinstance(name, str):
+        extra['name'] = name
+        name = None
+    category = task.category
+    if category is not None and not isinstance(category, str):
+        extra['category'] = category
+        category = None
+
+    if task.priority is None:
+        priority = NO_PRIORITY
+    else:
+        priority = PRIORITY_CODES.get(task.priority, OTHER_PRIORITY)
+        if priority == OTHER_PRIORITY:
+            extra['priority'] = task.priority
+
+    flags = COMPLETED if task.completed else 0
+    if not isinstance(task.completed, bool):
+        extra['completed'] = task.completed
+    if task.ongoing is not None:
+        flags |= HAS_ONGOING | (ONGOING if task.ongoing else 0)
+        if not isinstance(task.ongoing, bool):
+            extra['ongoing'] = task.ongoing
+
+    return RECORD.pack(task.id or 0, start, completion, reminder, *heap_ref(name), *heap_ref(category),
+                       *(heap_ref(json.dumps(extra)) if extra else (0, NO_STRING)), priority, flags)
+
+
+class BinaryTaskFile:
+    # Read-only sequence of the Tasks in a binary task file, decoded on
+    # access: tasks[i], tasks[start:stop], iteration. Close it (or use it as
+    # a context manager) to release the mapping.
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{filename} is not a binary task file")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, heap_offset, heap_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{filename} is not a binary task file")
+        if version != VERSION or record_size != RECORD.size or heap_offset + heap_size > len(self._map):
+            self._map.close()
+            raise ValueError(f"{filename}: unsupported or damaged binary task file")
+        self.count = count
+        self._heap = heap_offset
+
+    def _string(self, offset, length):
+        if length == NO_STRING:
+            return None
+        start = self._heap + offset
+        return self._map[start:start + length].decode('utf-8')
+
+    def task(self, index):
+        return self._decode(RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size),
+                            self._string, _parsed_date)
+
+    def _decode(self, record, string, date):
+        (task_id, start, completion, reminder, name_offset, name_length, category_offset,
+         category_length, extra_offset, extra_length, priority, flags) = record
+        task = Task.from_parsed(
+            task_id or None,
+            string(name_offset, name_length),
+            PRIORITIES[priority] if priority >= 0 else None,
+            bool(flags & COMPLETED),
+            bool(flags & ONGOING) if flags & HAS_ONGOING else None,
+            string(category_offset, category_length),
+            date(start),
+            date(completion),
+            date(reminder),
+        )
+        if extra_length != NO_STRING:
+            task.update(json.loads(string(extra_offset, extra_length)))
+        return task
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.task(position) for position in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("task index out of range")
+        return self.task(index)
+
+    def __iter__(self):
+        # Reading straight through: unpack the records in one pass and decode
+        # each repeated string or date once
+        strings = {}
+        dates = {}
+
+        def string(offset, length):
+            key = (offset, length)
+            text = strings.get(key)
+            if text is None and length != NO_STRING:
+                text = strings[key] = self._string(offset, length)
+            return text
+
+        def date(packed):
+            parsed = dates.get(packed)
+            if parsed is None:
+                parsed = dates[packed] = _parsed_date(packed)
+            return parsed
+
+        records = memoryview(self._map)[HEADER.size:self._heap]
+        try:
+            for record in RECORD.iter_unpack(records):
+                yield self._decode(record, string, date)
+        finally:
+            records.release()
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,99 @@
+import os
+import threading
+
+# Chart name -> figure size
+CHARTS = {
+    'completion': (14, 7),
+    'trends': (18, 6),
+    'summary': (14, 6),
+}
+
+
+class ChartExporter:
+    # Writes charts to PNG or SVG files with the Agg backend on a worker
+    # thread, so neither the CLI menu nor the Tk mainloop waits on matplotlib.
+    #
+    # Each file remembers the TaskStore.version it was drawn from. Asking
+    # again before the tasks change returns the existing file without
+    # touching matplotlib.
+
+    def __init__(self, directory='charts'):
+        self.directory = directory
+        self._rendered = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def export(self, chart, store, stats, fmt='png', period='D', archived=()):
+        # Returns a Future that resolves to the path of the image file.
+        # archived: tasks moved out of the store, drawn in the trends too
+        if chart not in CHARTS:
+            raise ValueError(f"Unknown chart: {chart}")
+        if fmt not in ('png', 'svg'):
+            raise ValueError(f"Unsupported image format: {fmt}")
+        name = f"{chart}-{period}" if chart == 'trends' else chart
+        path = os.path.join(self.directory, f"{name}.{fmt}")
+        version = store.version
+        # Imported here rather than at the top to keep startup light
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        with self._lock:
+            if self._rendered.get(path) == version and os.path.exists(path):
+                future = Future()
+                future.set_result(path)
+                return future
+            pending = self._pending.get(path)
+            if pending is not None and pending[0] == version:
+                return pending[1]
+
+        # Take what the chart needs now; the store may change while it renders
+        if chart == 'completion':
+            from charts import sample_tasks
+            tasks = [task.copy() for task in sample_tasks(store.list())]
+            # The title mentions the full count
+            tasks_total = len(store)
+        elif chart == 'trends':
+            tasks = [{'start_date': task.get('start_date'), 'completion_date': task.get('completion_date')}
+                     for task in list(store) + list(archived)]
+            tasks_total = None
+        else:
+            tasks = []
+            tasks_total = None
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-export')
+            future = self._executor.submit(self._render, chart, path, version, tasks, tasks_total, stats.copy(), fmt, period)
+            self._pending[path] = (version, future)
+        return future
+
+    def _render(self, chart, path, version, tasks, tasks_total, stats, fmt, period):
+        try:
+            # matplotlib and numpy are loaded on first export, not at startup
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from charts import draw_completion, draw_summary, draw_trends
+            fig = Figure(figsize=CHARTS[chart])
+            FigureCanvasAgg(fig)
+            if chart == 'completion':
+                draw_completion(fig, tasks, stats, total=tasks_total)
+            elif chart == 'trends':
+                draw_trends(fig, tasks, stats, period)
+            else:
+                draw_summary(fig, stats)
+
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f"{path}.tmp.{fmt}"
+            fig.savefig(temp_path, format=fmt)
+            os.replace(temp_path, path)
+            with self._lock:
+                self._rendered[path] = version
+            return path
+        finally:
+            with self._lock:
+                if self._pending.get(path, (None,))[0] == version:
+                    del self._pending[path]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
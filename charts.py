@@ -0,0 +1,175 @@
+import numpy as np
+
+# Aggregated charts for large task lists. Dates are turned into NumPy
+# datetime64 arrays once and everything is binned with array operations, so
+# the charts cost the same to draw for a hundred tasks or a hundred thousand.
+
+# Most tasks shown on the per-task chart
+SAMPLE_SIZE = 50
+
+PERIODS = {'D': 'Day', 'W': 'Week'}
+
+
+def date_column(tasks, key):
+    # datetime64[s] array of one date field; missing or bad dates become NaT
+    values = [task.get(key) or 'NaT' for task in tasks]
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except ValueError:
+        column = np.empty(len(values), dtype='datetime64[s]')
+        for i, value in enumerate(values):
+            try:
+                column[i] = np.datetime64(value, 's')
+            except ValueError:
+                column[i] = np.datetime64('NaT')
+        return column
+
+
+def to_period(dates, period='D'):
+    # Floor dates to the day, or to the Monday of their week
+    days = dates.astype('datetime64[D]')
+    if period == 'W':
+        # Day 0 (1970-01-01) was a Thursday, so Mondays are 3 days before a multiple of 7
+        day_numbers = days.astype('int64')
+        days = ((day_numbers + 3) // 7 * 7 - 3).astype('datetime64[D]')
+    return days
+
+
+def completions_per_period(completion_dates, period='D'):
+    done = completion_dates[~np.isnat(completion_dates)]
+    periods, counts = np.unique(to_period(done, period), return_counts=True)
+    return periods, counts
+
+
+def burn_down(start_dates, completion_dates, end=None):
+    # Number of open tasks at the end of each day, from the first start date
+    known = ~np.isnat(start_dates)
+    starts = np.sort(start_dates[known].astype('datetime64[D]'))
+    if len(starts) == 0:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=int)
+    completions = completion_dates[known]
+    completions = np.sort(completions[~np.isnat(completions)].astype('datetime64[D]'))
+    last = starts[-1] if len(completions) == 0 else max(starts[-1], completions[-1])
+    if end is not None:
+        last = max(last, np.datetime64(end, 'D'))
+    days = np.arange(starts[0], last + 1)
+    opened = np.searchsorted(starts, days, side='right')
+    closed = np.searchsorted(completions, days, side='right')
+    return days, opened - closed
+
+
+def sample_tasks(tasks, size=SAMPLE_SIZE):
+    # The most recent tasks, for charts that draw one mark per task
+    return tasks[-size:]
+
+
+def draw_trends(fig, tasks, stats, period='D'):
+    start_dates = date_column(tasks, 'start_date')
+    completion_dates = date_column(tasks, 'completion_date')
+
+    # Completions per day or week
+    ax = fig.add_subplot(1, 3, 1)
+    periods, counts = completions_per_period(completion_dates, period)
+    ax.bar(periods, counts, color='#D29F84', width=6 if period == 'W' else 0.8)
+    ax.set_title(f"Completed per {PERIODS[period]}", fontsize=14, fontweight='bold')
+    ax.tick_params(axis='x', rotation=45)
+
+    # Open tasks per category
+    ax = fig.add_subplot(1, 3, 2)
+    categories = stats.categories(open_only=True)
+    ax.barh([str(category) for category in categories], list(categories.values()), color='#F2C9A1')
+    ax.set_title("Open Tasks per Category", fontsize=14, fontweight='bold')
+
+    # Burn-down of open tasks over time
+    ax = fig.add_subplot(1, 3, 3)
+    days, open_counts = burn_down(start_dates, completion_dates, end=np.datetime64('today'))
+    ax.plot(days, open_counts, color='#D29F84', linewidth=2)
+    ax.fill_between(days, open_counts, color='#EFD8D3', alpha=0.3)
+    ax.set_title("Open Tasks Over Time", fontsize=14, fontweight='bold')
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    ax.tick_params(axis='x', rotation=45)
+
+    fig.tight_layout()
+    return fig
+
+
+def draw_completion(fig, tasks, stats, total=None):
+    # total is the full task count when tasks is already a sample
+    # Pie Chart
+    labels = ['Completed', 'Uncompleted']
+    sizes = [stats.completed, stats.uncompleted]
+    colors = ['#F2C9A1', '#E6B69A']  # Nude color palette
+    explode = (0.1, 0)  # explode the 1st slice (Completed)
+
+    ax = fig.add_subplot(1, 2, 1)
+    wedges, texts, autotexts = ax.pie(
+        sizes,
+        explode=explode,
+        labels=labels,
+        colors=colors,
+        autopct='%1.1f%%',
+        shadow=True,
+        startangle=90,
+        textprops={'fontsize': 14}
+    )
+
+    # Enhance pie chart text
+    for text in texts:
+        text.set_fontsize(14)
+        text.set_color('#5D3A28')  # Darker color for labels
+
+    for autotext in autotexts:
+        autotext.set_color('white')  # White color for percentage
+        autotext.set_fontsize(12)
+
+    ax.axis('equal')  # Equal aspect ratio ensures the pie is drawn as a circle
+    ax.set_title("Task Completion Visualization", fontsize=16, fontweight='bold')
+
+    # Line Chart, limited to the most recent tasks so it stays readable
+    ax = fig.add_subplot(1, 2, 2)
+    sample = sample_tasks(tasks)
+    positions = np.arange(len(sample))
+    task_names = [task['name'] for task in sample]
+    task_status = np.array([1 if task['completed'] else 0 for task in sample])  # 1 for completed, 0 for not completed
+
+    ax.plot(positions, task_status, marker='o', linestyle='-', color='#D29F84', linewidth=2, markersize=8, label='Task Status')
+
+    # Add fill between completed and uncompleted tasks
+    ax.fill_between(positions, task_status, color='#EFD8D3', alpha=0.3)
+
+    # Adding gridlines for better readability
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    ax.set_yticks([0, 1], ['Not Completed', 'Completed'])
+    ax.set_xticks(positions, task_names, rotation=45, ha='right')
+    title = "Task Completion Status"
+    total = len(tasks) if total is None else total
+    if total > len(sample):
+        title += f" (latest {len(sample)} of {total})"
+    ax.set_title(title, fontsize=16, fontweight='bold')
+    ax.set_xlabel("Tasks", fontsize=14)
+    ax.set_ylabel("Status", fontsize=14)
+    ax.legend(loc='upper left')
+
+    fig.tight_layout()
+    return fig
+
+
+def draw_summary(fig, stats):
+    # Completion pie and tasks per category, as shown by the Tkinter app
+    ax = fig.add_subplot(1, 2, 1)
+    ax.pie([stats.completed, stats.uncompleted], labels=['Completed', 'Uncompleted'],
+           colors=['#66c2a5', '#fc8d62'], autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')
+    ax.set_title('Task Completion Status')
+
+    ax = fig.add_subplot(1, 2, 2)
+    categories = stats.categories()
+    ax.bar([str(category) for category in categories], list(categories.values()), color='#66c2a5')
+    ax.set_xlabel('Categories')
+    ax.set_ylabel('Number of Tasks')
+    ax.set_title('Number of Tasks per Category')
+    ax.tick_params(axis='x', rotation=45)
+
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,171 @@
+import os
+from collections import deque
+from contextlib import contextmanager
+
+# Undo and redo for the menu and the GUI. History listens to the store and
+# keeps each change as a delta: the task that was added or removed, or the
+# old and new values of the fields an update changed. Undoing replays the
+# inverse deltas through the store, so it costs as much as the change did
+# instead of a reload of the whole list.
+
+# Memory the undo history may use, in bytes (estimated); the oldest changes
+# are forgotten past it
+HISTORY_BYTES = int(os.environ.get('TODO_HISTORY_BYTES', 4 * 2 ** 20))
+
+# Rough sizes of the Python objects a delta holds
+_TASK_BYTES = 150
+_STR_BYTES = 50
+_DELTA_BYTES = 100
+_FIELD_BYTES = 120
+
+
+def _task_bytes(task):
+    size = _TASK_BYTES
+    for value in (task.name, task.category, task.start_date, task.completion_date, task.reminder_date):
+        if isinstance(value, str):
+            size += _STR_BYTES + len(value)
+    return size
+
+
+def _delta_bytes(delta):
+    if delta[0] == 'update':
+        return _DELTA_BYTES + _FIELD_BYTES * len(delta[2])
+    return _DELTA_BYTES + _task_bytes(delta[1])
+
+
+def _label(delta):
+    if delta[0] == 'update':
+        return 'complete' if delta[2].keys() == {'completed', 'completion_date'} else 'edit'
+    return delta[0]
+
+
+class History:
+    # Store listener recording changes for undo() and redo(). An entry is
+    # (label, deltas, estimated bytes); group() turns everything done inside
+    # it (an import, say) into one entry. Entries sit in a ring buffer that
+    # drops the oldest once max_bytes is passed.
+    #
+    # A reset (a reload after another process changed the tasks, or a
+    # replace) clears the history: its deltas no longer line up with the
+    # tasks.
+
+    def __init__(self, store, max_bytes=None):
+        self.store = store
+        self.max_bytes = HISTORY_BYTES if max_bytes is None else max_bytes
+        self._done = deque()
+        self._undone = []
+        self._bytes = 0
+        self._group = None
+        self._group_depth = 0
+        self._replaying = False
+
+    def reset(self, tasks):
+        self.clear()
+        if self._group is not None:
+            # The group's deltas no longer line up with the tasks either
+            self._group[1] = None
+
+    def clear(self):
+        self._done.clear()
+        self._undone = []
+        self._bytes = 0
+
+    def on_add(self, task):
+        self._record(('add', task.copy()))
+
+    def on_update(self, task, old):
+        new = {key: task.get(key) for key in old}
+        self._record(('update', task.id, dict(old), new))
+
+    def on_remove(self, task):
+        self._record(('remove', task.copy()))
+
+    def _record(self, delta):
+        if self._replaying:
+            return
+        self._undone = []
+        group = self._group
+        if group is not None:
+            if group[1] is not None:
+                group[1].append(delta)
+                group[2] += _delta_bytes(delta)
+                if group[2] > self.max_bytes:
+                    # Can't be undone anyway; stop holding on to it
+                    group[1] = None
+            return
+        self._push([_label(delta), [delta], _delta_bytes(delta)])
+
+    def _push(self, entry):
+        self._done.append(entry)
+        self._bytes += entry[2]
+        while self._done and self._bytes > self.max_bytes:
+            # Too big: forget the oldest changes (all of them, if this one
+            # alone is over the cap)
+            self._bytes -= self._done.popleft()[2]
+
+    @contextmanager
+    def group(self, label):
+        self._group_depth += 1
+        if self._group_depth == 1:
+            self._group = [label, [], 0]
+        # Record the changes made inside the block as one undo step. If the
+        # block raises, what it did before that is still one step.
+        try:
+            yield self
+        finally:
+            self._group_depth -= 1
+            if self._group_depth == 0:
+                entry, self._group = self._group, None
+                if entry[1] is None:
+                    # Too big to keep, or cut short by a reload; older
+                    # changes can't be undone past it
+                    self.clear()
+                elif entry[1]:
+                    self._push(entry)
+
+    def can_undo(self):
+        return bool(self._done)
+
+    def can_redo(self):
+        return bool(self._undone)
+
+    def undo(self):
+        # Revert the last change; returns its label, or None if there is none
+        if not self._done:
+            return None
+        entry = self._done.pop()
+        self._bytes -= entry[2]
+        self._replay(reversed(entry[1]), undo=True)
+        self._undone.append(entry)
+        return entry[0]
+
+    def redo(self):
+        # Make the last undone change again; returns its label or None
+        if not self._undone:
+            return None
+        entry = self._undone.pop()
+        self._replay(entry[1], undo=False)
+        self._done.append(entry)
+        self._bytes += entry[2]
+        return entry[0]
+
+    def _replay(self, deltas, undo):
+        store = self.store
+        self._replaying = True
+        try:
+            with store.batch():
+                for delta in deltas:
+                    kind = delta[0]
+                    if kind == 'update':
+                        _, task_id, old, new = delta
+                        store.update(task_id, **(old if undo else new))
+                    elif (kind == 'add') == undo:
+                        store.remove(delta[1].id)
+                    else:
+                        # A copy, so the recorded task stays as it was
+                        store.restore(delta[1].copy())
+        finally:
+            self._replaying = False
+
+    def __len__(self):
+        return len(self._done)
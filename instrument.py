@@ -0,0 +1,160 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Opt-in timing of the app's hot paths. Nothing is wrapped unless it is
+# switched on, so a normal run pays nothing:
+#
+#   TODO_INSTRUMENT=1 python FINAL.py          (or python FINAL.py --instrument)
+#       calls, total and slowest time per function, printed on exit
+#   TODO_PROFILE=todo.pstats python APP.py     (or python APP.py --profile todo.pstats)
+#       cProfile data for the whole run, rewritten every TODO_PROFILE_INTERVAL
+#       seconds and on exit; read it with python -m pstats todo.pstats
+#
+# The profiler only sees the thread that started it (the menu or Tk loop),
+# not the storage, export or compaction threads.
+
+# Functions install() wraps when they exist in the entry point. Writes
+# (save_tasks) and task list redraws (update_task_list, render_task_list)
+# are timed where they happen, in the storage backends and TaskTreeView.
+HOT_PATHS = ('load_tasks', 'check_reminders', 'display_tasks', 'visualize_tasks')
+
+PROFILE_INTERVAL = float(os.environ.get('TODO_PROFILE_INTERVAL', 60))
+
+enabled = False
+
+# name -> [calls, total seconds, slowest call in seconds]
+_timings = {}
+_timings_lock = threading.Lock()
+_profiler = None
+_profile_path = None
+_profile_thread = None
+_last_dump = 0.0
+
+
+def configure(argv):
+    # Switch on what the environment and --instrument / --profile FILE ask
+    # for; returns argv without those options
+    global enabled
+    rest = []
+    profile_path = os.environ.get('TODO_PROFILE') or None
+    timing = os.environ.get('TODO_INSTRUMENT', '') not in ('', '0')
+    args = iter(argv)
+    for arg in args:
+        if arg == '--instrument':
+            timing = True
+        elif arg == '--profile':
+            profile_path = next(args, None)
+            if profile_path is None:
+                sys.exit("--profile needs a file name")
+        elif arg.startswith('--profile='):
+            profile_path = arg[len('--profile='):]
+        else:
+            rest.append(arg)
+    if timing or profile_path:
+        enabled = True
+        if timing:
+            atexit.register(print_summary)
+        if profile_path:
+            start_profile(profile_path)
+    return rest
+
+
+def start_profile(path):
+    global _profiler, _profile_path, _profile_thread, _last_dump
+    import cProfile
+    _profile_path = path
+    _profile_thread = threading.get_ident()
+    _profiler = cProfile.Profile()
+    _last_dump = time.monotonic()
+    atexit.register(dump_profile)
+    _profiler.enable()
+
+
+def dump_profile():
+    # Write the profile so far; dump_stats stops the profiler, so it is
+    # started again afterwards
+    global _last_dump
+    if _profiler is None:
+        return
+    _profiler.dump_stats(_profile_path)
+    _last_dump = time.monotonic()
+    _profiler.enable()
+
+
+def record(name, seconds):
+    # Writes are timed on the storage writer thread
+    with _timings_lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = [0, 0.0, 0.0]
+        timing[0] += 1
+        timing[1] += seconds
+        if seconds > timing[2]:
+            timing[2] = seconds
+    if (_profiler is not None and threading.get_ident() == _profile_thread
+            and time.monotonic() - _last_dump >= PROFILE_INTERVAL):
+        # Only on the profiled thread (not the storage writer), between hot
+        # path calls
+        dump_profile()
+
+
+def timed(func, name=None):
+    # func wrapped to record its calls under name (func's name by default)
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - start)
+    return wrapper
+
+
+@contextmanager
+def timer(name):
+    # Time the block under name; just runs it when instrumentation is off
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def install(namespace, names=HOT_PATHS):
+    # Wrap the named functions of a module's globals() with timed(), so
+    # calls through the module's own names are recorded. Does nothing
+    # unless configure() switched instrumentation on.
+    if not enabled:
+        return
+    for name in names:
+        func = namespace.get(name)
+        if callable(func):
+            namespace[name] = timed(func, name)
+
+
+def summary():
+    # Lines of the timing table, slowest total first
+    lines = [f"{'function':<20} {'calls':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10}"]
+    for name, (calls, total, slowest) in sorted(_timings.items(), key=lambda item: -item[1][1]):
+        lines.append(f"{name:<20} {calls:>8} {total * 1000:>12.1f} {total / calls * 1000:>10.2f} "
+                     f"{slowest * 1000:>10.2f}")
+    return lines
+
+
+def print_summary(file=None):
+    file = file or sys.stderr
+    if not _timings:
+        print("instrument: no instrumented calls", file=file)
+        return
+    for line in summary():
+        print(line, file=file)
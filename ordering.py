@@ -0,0 +1,201 @@
+import bisect
+from itertools import islice
+from task import PRIORITIES
+
+# Orderings of the task list kept sorted as tasks change, so a sorted (and
+# filtered) page is a bisect and a slice instead of a sort of every task.
+
+# High first, then Medium, then Low; unknown priorities last
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(reversed(PRIORITIES))}
+
+
+def priority_key(task):
+    return PRIORITY_RANK.get(task.priority, len(PRIORITY_RANK))
+
+
+def reminder_key(task):
+    # Earliest reminder first; tasks without one last
+    return (task.reminder_ts is None, task.reminder_ts or 0)
+
+
+def category_key(task):
+    return (task.category is None, (task.category or '').casefold())
+
+
+def id_key(task):
+    return task.id
+
+
+SORT_KEYS = {
+    'id': id_key,
+    'priority': priority_key,
+    'reminder': reminder_key,
+    'category': category_key,
+}
+
+# Fields a SortedIndex can filter on without scanning
+FILTER_FIELDS = ('completed', 'category', 'priority')
+
+
+def filter_values(task):
+    return (bool(task.completed), task.category, task.priority)
+
+
+class SortedIndex:
+    # Store listener keeping the task ids ordered by one of SORT_KEYS, both
+    # overall and within each value of every FILTER_FIELDS field. Entries are
+    # (key, id) tuples, so ties keep task id order; changes are one bisect
+    # and list insert per list.
+
+    def __init__(self, sort='id'):
+        self.sort = sort
+        self.key = SORT_KEYS[sort]
+        self.reset([])
+
+    def reset(self, tasks):
+        self._entries = {}
+        self.all = []
+        self.partitions = {field: {} for field in FILTER_FIELDS}
+        rows = [((self.key(task), task.id), filter_values(task)) for task in tasks]
+        rows.sort()
+        for entry, values in rows:
+            # Appending in sorted order keeps every list sorted
+            self._entries[entry[1]] = (entry, values)
+            self.all.append(entry)
+            for field, value in zip(FILTER_FIELDS, values):
+                self.partitions[field].setdefault(value, []).append(entry)
+
+    def _insert(self, task):
+        entry = (self.key(task), task.id)
+        values = filter_values(task)
+        self._entries[task.id] = (entry, values)
+        bisect.insort(self.all, entry)
+        for field, value in zip(FILTER_FIELDS, values):
+            bisect.insort(self.partitions[field].setdefault(value, []), entry)
+
+    def _delete(self, task_id):
+        entry, values = self._entries.pop(task_id)
+        del self.all[bisect.bisect_left(self.all, entry)]
+        for field, value in zip(FILTER_FIELDS, values):
+            entries = self.partitions[field][value]
+            del entries[bisect.bisect_left(entries, entry)]
+            if not entries:
+                del self.partitions[field][value]
+
+    def on_add(self, task):
+        self._insert(task)
+
+    def on_update(self, task, old):
+        entry, values = self._entries[task.id]
+        if entry[0] != self.key(task) or values != filter_values(task):
+            self._delete(task.id)
+            self._insert(task)
+
+    def on_remove(self, task):
+        self._delete(task.id)
+
+    def __len__(self):
+        return len(self.all)
+
+    def _source(self, filters):
+        # The shortest sorted list covering the filters, and a check for the
+        # filters it doesn't cover (None if it covers them all)
+        if not filters:
+            return self.all, None
+        lists = [(self.partitions[field].get(value, []), field) for field, value in filters.items()]
+        entries, field = min(lists, key=lambda item: len(item[0]))
+        rest = [(FILTER_FIELDS.index(other), value) for other, value in filters.items() if other != field]
+        if not rest:
+            return entries, None
+
+        def check(entry):
+            values = self._entries[entry[1]][1]
+            return all(values[position] == value for position, value in rest)
+        return entries, check
+
+    def ids(self, start=0, count=None, reverse=False, completed=None, category=None, priority=None):
+        # Ids of the matching tasks in sort order, skipping the first start
+        # and returning at most count. With at most one filter this is a
+        # slice: O(count) however many tasks there are.
+        filters = self._filters(completed, category, priority)
+        entries, check = self._source(filters)
+        stop = None if count is None else start + count
+        if check is None:
+            if reverse:
+                high = len(entries) - start
+                low = 0 if stop is None else max(high - count, 0)
+                return [entry[1] for entry in reversed(entries[low:high])]
+            return [entry[1] for entry in entries[start:stop]]
+        matching = filter(check, reversed(entries) if reverse else entries)
+        return [entry[1] for entry in islice(matching, start, stop)]
+
+    def count(self, completed=None, category=None, priority=None):
+        entries, check = self._source(self._filters(completed, category, priority))
+        if check is None:
+            return len(entries)
+        return sum(1 for entry in entries if check(entry))
+
+    def _filters(self, completed, category, priority):
+        filters = {}
+        if completed is not None:
+            filters['completed'] = bool(completed)
+        if category is not None:
+            filters['category'] = category
+        if priority is not None:
+            filters['priority'] = priority
+        return filters
+
+
+class SortedView:
+    # Read-only sequence of the tasks a SortedIndex selects, for paging:
+    # view[start:stop] reads just that page from the index
+
+    def __init__(self, store, index, reverse=False, **filters):
+        self.store = store
+        self.index = index
+        self.reverse = reverse
+        self.filters = filters
+        self._length = index.count(**filters)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice) or page.step not in (None, 1):
+            raise TypeError("SortedView only supports plain slices")
+        start, stop, _ = page.indices(self._length)
+        ids = self.index.ids(start, max(stop - start, 0), self.reverse, **self.filters)
+        return [self.store.get(task_id) for task_id in ids]
+
+    def __iter__(self):
+        for task_id in self.index.ids(0, None, self.reverse, **self.filters):
+            yield self.store.get(task_id)
+
+
+def parse_view(text):
+    # "status=open category=Work priority=high sort=-reminder" ->
+    # (filters, sort, reverse). A leading "-" on sort reverses it.
+    filters = {}
+    sort = 'id'
+    reverse = False
+    for part in text.split():
+        field, sep, value = part.partition('=')
+        field = field.lower()
+        if not sep or not value:
+            raise ValueError(f"Expected FIELD=VALUE, got {part!r}")
+        if field == 'status':
+            if value.lower() not in ('open', 'completed'):
+                raise ValueError("status must be open or completed")
+            filters['completed'] = value.lower() == 'completed'
+        elif field == 'category':
+            filters['category'] = value
+        elif field == 'priority':
+            filters['priority'] = value.capitalize()
+        elif field == 'sort':
+            reverse = value.startswith('-')
+            sort = value.lstrip('-').lower()
+            if sort not in SORT_KEYS:
+                raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        else:
+            raise ValueError(f"Unknown field {field!r}; use status, category, priority or sort")
+    return filters, sort, reverse
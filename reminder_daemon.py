@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from reminders import ReminderScheduler
+from storage import open_storage
+from task_store import TaskStore
+
+# Long-running reminder service:
+#
+#   python reminder_daemon.py --log reminders.log --webhook http://localhost:8080/hook
+#
+# The reminders sit in one ReminderScheduler heap and the daemon sleeps on a
+# single timer until the earliest one is due, however many are scheduled.
+# While idle it wakes every WATCH_INTERVAL seconds only to stat() the task
+# file; when another process (the menu, the GUI, a batch run) changed the
+# tasks, the store reloads and the timer is set again. Due reminders go to
+# every sink: stdout, a log file, a webhook.
+#
+# A sink is any object with an async send(tasks) method taking a list of
+# due Tasks.
+
+# Seconds between checks for changes made by other processes
+WATCH_INTERVAL = float(os.environ.get('TODO_REMINDER_WATCH', 2))
+
+# Reminders per webhook request
+WEBHOOK_BATCH = 500
+
+
+def reminder_message(task):
+    return f"Reminder: Task '{task.name}' is due on {task.reminder_date}."
+
+
+class StdoutSink:
+
+    async def send(self, tasks):
+        sys.stdout.write(''.join(reminder_message(task) + '\n' for task in tasks))
+        sys.stdout.flush()
+
+
+class LogFileSink:
+    # Appends one timestamped line per reminder
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    async def send(self, tasks):
+        stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        text = ''.join(f"{stamp} {reminder_message(task)}\n" for task in tasks)
+        await asyncio.to_thread(self._append, text)
+
+    def _append(self, text):
+        with open(self.filename, 'a', encoding='utf-8') as file:
+            file.write(text)
+
+
+class WebhookSink:
+    # POSTs {"reminders": [task, ...]} as JSON to url, WEBHOOK_BATCH tasks a
+    # request. The request runs on a worker thread so a slow endpoint doesn't
+    # hold up the timer.
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, tasks):
+        for start in range(0, len(tasks), WEBHOOK_BATCH):
+            body = json.dumps({'reminders': [task.to_dict() for task in tasks[start:start + WEBHOOK_BATCH]]})
+            await asyncio.to_thread(self._post, body.encode('utf-8'))
+
+    def _post(self, body):
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class ReminderDaemon:
+    # Store listener too: a change made in this process wakes the timer, as
+    # it may have moved the next reminder. The scheduler remembers what was
+    # sent, so a reload doesn't send it again.
+
+    def __init__(self, store, sinks, lead=timedelta(days=1), watch_interval=WATCH_INTERVAL):
+        self.store = store
+        self.sinks = sinks
+        self.watch_interval = watch_interval
+        self.scheduler = store.subscribe(ReminderScheduler(lead=lead))
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        store.subscribe(self)
+
+    def reset(self, tasks):
+        self._wakeup.set()
+
+    def on_add(self, task):
+        self._wakeup.set()
+
+    def on_update(self, task, old):
+        self._wakeup.set()
+
+    def on_remove(self, task):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+
+    def due(self, now=None):
+        # Tasks whose reminder is due and hasn't been sent yet
+        tasks = map(self.store.get, self.scheduler.pop_due(now))
+        return [task for task in tasks if task is not None]
+
+    async def dispatch(self, tasks):
+        results = await asyncio.gather(*(sink.send(tasks) for sink in self.sinks), return_exceptions=True)
+        for sink, result in zip(self.sinks, results):
+            if isinstance(result, Exception):
+                # One failing sink doesn't keep the others from their reminders
+                print(f"Reminder sink {type(sink).__name__} failed: {result}", file=sys.stderr)
+
+    def _timeout(self):
+        # Seconds until the next reminder or the next change check,
+        # whichever comes first; None to sleep until woken
+        next_due = self.scheduler.next_due()
+        timeout = self.watch_interval or None
+        if next_due is not None:
+            until_due = max(0, next_due - time.time())
+            timeout = until_due if timeout is None else min(timeout, until_due)
+        return timeout
+
+    async def run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            due = self.due()
+            if due:
+                await self.dispatch(due)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._timeout())
+            except asyncio.TimeoutError:
+                pass
+            if self.watch_interval:
+                self.store.refresh()
+
+
+async def serve(daemon):
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, daemon.stop)
+        except (NotImplementedError, AttributeError, ValueError):
+            # Windows: Ctrl+C ends asyncio.run with KeyboardInterrupt instead
+            pass
+    await daemon.run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send task reminders as they come due.")
+    parser.add_argument('--file', default='todo_list.json', help="task file (default: todo_list.json)")
+    parser.add_argument('--log', metavar='FILE', help="also append reminders to FILE")
+    parser.add_argument('--webhook', metavar='URL', help="also POST reminders as JSON to URL")
+    parser.add_argument('--quiet', action='store_true', help="don't print reminders")
+    parser.add_argument('--lead-days', type=float, default=1,
+                        help="remind this many days before the reminder date (default: 1)")
+    parser.add_argument('--watch', type=float, default=WATCH_INTERVAL, metavar='SECONDS',
+                        help=f"check for changes every SECONDS, 0 to never (default: {WATCH_INTERVAL:g})")
+    args = parser.parse_args(argv)
+
+    sinks = [] if args.quiet else [StdoutSink()]
+    if args.log:
+        sinks.append(LogFileSink(args.log))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    if not sinks:
+        parser.error("--quiet needs --log or --webhook")
+
+    store = TaskStore(open_storage(args.file)).load()
+    try:
+        asyncio.run(serve(ReminderDaemon(store, sinks, timedelta(days=args.lead_days), args.watch)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
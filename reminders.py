@@ -0,0 +1,95 @@
+import heapq
+import time
+from datetime import timedelta
+
+
+class ReminderScheduler:
+    # Keeps open tasks with a reminder in a min-heap ordered by the time the
+    # reminder should fire (the reminder date minus the lead time), so a check
+    # only looks at the reminders that are due instead of going over every
+    # task. Reminder dates come already parsed (Task.reminder_ts).
+    #
+    # Changed or removed tasks are not dug out of the heap; the current fire
+    # time per task is kept in self._scheduled and stale heap entries are
+    # dropped when they reach the top.
+    #
+    # Reminders already handed out are remembered (task id -> fire time) so
+    # a reload, which resets every listener, doesn't hand them out again.
+    # Moving a task's reminder date schedules it anew.
+
+    def __init__(self, lead=timedelta(days=1)):
+        self.lead = lead.total_seconds()
+        self._heap = []
+        self._scheduled = {}
+        self._delivered = {}
+
+    def reset(self, tasks):
+        self._scheduled = {}
+        delivered = {}
+        for task in tasks:
+            fire_at = self._fire_time(task)
+            if fire_at is None:
+                continue
+            if self._delivered.get(task.id) == fire_at:
+                delivered[task.id] = fire_at
+            else:
+                self._scheduled[task.id] = fire_at
+        self._delivered = delivered
+        self._heap = [(fire_at, task_id) for task_id, fire_at in self._scheduled.items()]
+        heapq.heapify(self._heap)
+
+    def _fire_time(self, task):
+        if task.completed or task.reminder_ts is None:
+            return None
+        return task.reminder_ts - self.lead
+
+    def _schedule(self, task):
+        fire_at = self._fire_time(task)
+        if fire_at is None or self._delivered.get(task.id) == fire_at:
+            self._scheduled.pop(task.id, None)
+            return
+        self._scheduled[task.id] = fire_at
+        heapq.heappush(self._heap, (fire_at, task.id))
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            # Mostly stale entries; rebuild from the live ones
+            self._heap = [(fire_at, task_id) for task_id, fire_at in self._scheduled.items()]
+            heapq.heapify(self._heap)
+
+    def on_add(self, task):
+        self._schedule(task)
+
+    def on_update(self, task, old):
+        if 'completed' in old or 'reminder_date' in old:
+            self._schedule(task)
+
+    def on_remove(self, task):
+        self._scheduled.pop(task.id, None)
+        self._delivered.pop(task.id, None)
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_at, task_id = self._heap[0]
+            if self._scheduled.get(task_id) == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now=None):
+        # Ids of the tasks whose reminder is due, each handed out only once
+        now = time.time() if now is None else now
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, task_id = heapq.heappop(self._heap)
+            del self._scheduled[task_id]
+            self._delivered[task_id] = fire_at
+            due.append(task_id)
+            self._drop_stale()
+        return due
+
+    def next_due(self):
+        # Epoch time of the next reminder, or None if nothing is scheduled
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._scheduled)
@@ -0,0 +1,123 @@
+import bisect
+import re
+
+# Word search over task names and categories. Every word of a query has to
+# match the start of a word in the task's name or category, so results
+# narrow down as the user types ("gro" finds "Buy Groceries").
+
+WORD = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return WORD.findall(text.lower()) if text else []
+
+
+def task_tokens(task):
+    return frozenset(tokenize(task.name) + tokenize(task.category))
+
+
+def matches(task, terms):
+    # Whether task matches every term (as a word prefix); for checking one
+    # task without the index
+    tokens = task_tokens(task)
+    return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+
+def _prefix_end(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SearchIndex:
+    # Store listener keeping an inverted index: word -> ids of the tasks whose
+    # name or category contains it. The words are also kept sorted, so all
+    # words starting with a prefix are one bisect away.
+    #
+    # The last result is kept: when the user types more of the same query,
+    # only the changed words are looked up and intersected with it.
+
+    def __init__(self):
+        self.reset([])
+
+    def reset(self, tasks):
+        self._postings = {}
+        self._tokens = {}
+        for task in tasks:
+            self._index(task, sort=False)
+        self._words = sorted(self._postings)
+        self._last = None
+
+    def _index(self, task, sort=True):
+        tokens = task_tokens(task)
+        self._tokens[task.id] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                if sort:
+                    bisect.insort(self._words, token)
+            ids.add(task.id)
+
+    def _unindex(self, task_id):
+        for token in self._tokens.pop(task_id, ()):
+            ids = self._postings[token]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[token]
+                del self._words[bisect.bisect_left(self._words, token)]
+
+    def on_add(self, task):
+        self._index(task)
+        self._last = None
+
+    def on_update(self, task, old):
+        if 'name' in old or 'category' in old:
+            self._unindex(task.id)
+            self._index(task)
+            self._last = None
+
+    def on_remove(self, task):
+        self._unindex(task.id)
+        self._last = None
+
+    def words(self, prefix):
+        # Indexed words starting with prefix, in sorted order
+        start = bisect.bisect_left(self._words, prefix)
+        end = bisect.bisect_left(self._words, _prefix_end(prefix), start)
+        return self._words[start:end]
+
+    def _term_ids(self, term, within=None):
+        # Ids with a word starting with term; only those in within if given
+        postings = [self._postings[word] for word in self.words(term)]
+        if within is not None and len(within) < sum(map(len, postings)):
+            # Fewer candidates than matches: check the candidates word by word
+            return set().union(*(within & ids for ids in postings))
+        ids = postings[0] if len(postings) == 1 else set().union(*postings)
+        return ids if within is None else ids & within
+
+    def search(self, query):
+        # Set of ids of the tasks matching every word of query. The set may
+        # be shared with the index; don't modify it.
+        terms = tokenize(query)
+        if not terms:
+            return set()
+        result = None
+        lookups = terms
+        if self._last is not None:
+            last_terms, last_result = self._last
+            if len(terms) >= len(last_terms) and all(
+                    term.startswith(last) for term, last in zip(terms, last_terms)):
+                # The query only grew; narrow the last result down
+                result = last_result
+                lookups = [term for position, term in enumerate(terms)
+                           if position >= len(last_terms) or term != last_terms[position]]
+        # Longer words usually match fewer tasks; start with them
+        for term in sorted(lookups, key=len, reverse=True):
+            result = self._term_ids(term, result)
+            if not result:
+                break
+        self._last = (terms, result)
+        return result
+
+    def __len__(self):
+        return len(self._tokens)
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import sys
+from instrument import timer
+from task import FIELDS, Task
+
+# SQLite storage backend. Each task is one row, so a change is a single-row
+# write, and the indexes on category, priority and completed let filtered
+# views read only the rows they need. (Reminders come from the in-memory
+# ReminderScheduler.)
+
+# "extra" holds the task's fields outside the schema (Task.extra) as JSON
+COLUMNS = ['id', 'name', 'priority', 'completed', 'ongoing', 'start_date',
+           'completion_date', 'category', 'reminder_date', 'extra']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    priority TEXT,
+    completed INTEGER NOT NULL DEFAULT 0,
+    ongoing INTEGER,
+    start_date TEXT,
+    completion_date TEXT,
+    category TEXT,
+    reminder_date TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_reminder_date ON tasks (reminder_date);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def task_to_row(task):
+    task = Task.from_dict(task)
+    row = [task.get(column) for column in COLUMNS]
+    row[COLUMNS.index('completed')] = int(bool(task.get('completed', False)))
+    ongoing = task.get('ongoing')
+    row[COLUMNS.index('ongoing')] = None if ongoing is None else int(ongoing)
+    row[COLUMNS.index('extra')] = json.dumps(task.extra) if task.extra else None
+    return row
+
+
+def row_to_task(row):
+    # A NULL "ongoing" stays unset; most tasks never had the field
+    values = dict(zip(COLUMNS, row))
+    extra = values.pop('extra')
+    task = Task(**values, extra=json.loads(extra) if extra else None)
+    task.completed = bool(task.completed)
+    if task.ongoing is not None:
+        task.ongoing = bool(task.ongoing)
+    return task
+
+
+class SqliteStorage:
+
+    def __init__(self, filename):
+        self.filename = filename
+        base, _ = os.path.splitext(filename)
+        self.db_path = base + '.db'
+        self.tasks = {}
+        self._data_version = None
+        self.connection = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        add_missing_columns(self.connection)
+
+    def load(self):
+        # The 'migrated' counter marks a database past its first run, so one
+        # whose tasks were all removed isn't filled from todo_list.json again
+        first_run = not self.connection.execute("SELECT 1 FROM counters WHERE name = 'migrated'").fetchone()
+        if first_run:
+            empty = self.connection.execute("SELECT NOT EXISTS (SELECT 1 FROM tasks)").fetchone()[0]
+            if empty and os.path.exists(self.filename):
+                # First run on an existing todo_list.json
+                migrate(self.db_path, [self.filename], connection=self.connection)
+            self.connection.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('migrated', 1)")
+        cursor = self.connection.execute(f"SELECT {', '.join(COLUMNS)} FROM tasks ORDER BY id")
+        self.tasks = {row[0]: row_to_task(row) for row in cursor}
+        self._data_version = self._current_data_version()
+        return self.tasks
+
+    def _current_data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def changed(self):
+        # SQLite bumps data_version whenever another connection commits
+        return self._current_data_version() != self._data_version
+
+    def reserve_ids(self, first, count):
+        # The next free id lives in the counters table, so connections from
+        # other processes never hand out the same one
+        own_transaction = not self.connection.in_transaction
+        if own_transaction:
+            self.connection.execute("BEGIN IMMEDIATE")
+        row = self.connection.execute("SELECT value FROM counters WHERE name = 'next_id'").fetchone()
+        used = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM tasks").fetchone()[0]
+        start = max(first, used, row[0] if row else 1)
+        self.connection.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('next_id', ?)", (start + count,))
+        if own_transaction:
+            self.connection.execute("COMMIT")
+        return start, start + count
+
+    def release_ids(self, start, stop):
+        # Runs inside the batch's transaction, or on its own
+        self.connection.execute("UPDATE counters SET value = ? WHERE name = 'next_id' AND value = ?", (start, stop))
+
+    def add(self, task):
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        with timer('save_tasks'):
+            self.connection.execute(f"INSERT INTO tasks ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                                    task_to_row(task))
+
+    def update(self, task_id, fields):
+        row = task_to_row(self.tasks[task_id])
+        changed = [column for column in COLUMNS if column in fields and column != 'extra']
+        if any(key not in FIELDS for key in fields):
+            changed.append('extra')
+        if not changed:
+            return
+        assignments = ', '.join(f"{column} = ?" for column in changed)
+        values = [row[COLUMNS.index(column)] for column in changed]
+        with timer('save_tasks'):
+            self.connection.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", values + [task_id])
+
+    def delete(self, task_id):
+        with timer('save_tasks'):
+            self.connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def save(self, tasks):
+        self.tasks = tasks
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        # Inside begin()/commit() the batch's transaction already covers this
+        own_transaction = not self.connection.in_transaction
+        with timer('save_tasks'):
+            if own_transaction:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute("DELETE FROM tasks")
+            self.connection.executemany(
+                f"INSERT INTO tasks ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                (task_to_row(task) for task in tasks.values()))
+            if own_transaction:
+                self.connection.execute("COMMIT")
+
+    def begin(self):
+        # Take the write lock up front; a deferred transaction that read
+        # first can't write once another process has committed
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        with timer('save_tasks'):
+            self.connection.execute("COMMIT")
+
+    def rollback(self):
+        self.connection.execute("ROLLBACK")
+
+    def find(self, category=None, priority=None, completed=None):
+        # Ids of the tasks matching every filter that was given
+        conditions = []
+        values = []
+        for column, value in (('category', category), ('priority', priority), ('completed', completed)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(int(value) if column == 'completed' else value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.connection.execute(f"SELECT id FROM tasks {where} ORDER BY id", values)
+        return [row[0] for row in cursor]
+
+    def close(self):
+        self.connection.close()
+
+
+def add_missing_columns(connection):
+    # Databases made before the extra column existed get it added
+    existing = {row[1] for row in connection.execute("PRAGMA table_info(tasks)")}
+    if 'extra' not in existing:
+        connection.execute("ALTER TABLE tasks ADD COLUMN extra TEXT")
+
+
+def migrate(db_path, json_files, connection=None):
+    # One-shot import of todo_list.json style files into a SQLite database.
+    # Tasks keep their id when it is free; otherwise they get a new one.
+    own_connection = connection is None
+    if own_connection:
+        connection = sqlite3.connect(db_path, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        add_missing_columns(connection)
+    placeholders = ', '.join('?' for _ in COLUMNS)
+    count = 0
+    with connection:
+        connection.execute("BEGIN")
+        for json_file in json_files:
+            with open(json_file, 'r') as file:
+                file_tasks = json.load(file)
+            for task in file_tasks:
+                row = task_to_row(task)
+                if row[0] is not None and connection.execute("SELECT 1 FROM tasks WHERE id = ?", (row[0],)).fetchone():
+                    row[0] = None
+                connection.execute(f"INSERT INTO tasks ({', '.join(COLUMNS)}) VALUES ({placeholders})", row)
+                count += 1
+    if own_connection:
+        connection.close()
+    return count
+
+
+if __name__ == "__main__":
+    # python sqlite_storage.py todo_list.db todo_list.json export_tasks.json
+    if len(sys.argv) < 3:
+        print("Usage: python sqlite_storage.py DATABASE JSON_FILE [JSON_FILE ...]")
+        sys.exit(1)
+    imported = migrate(sys.argv[1], sys.argv[2:])
+    print(f"Migrated {imported} tasks into {sys.argv[1]}.")
@@ -0,0 +1,86 @@
+from collections import Counter
+
+# Upper bounds (in seconds) of the completion-time histogram buckets
+COMPLETION_BUCKETS = [
+    ("< 1 hour", 3600),
+    ("< 1 day", 86400),
+    ("< 1 week", 7 * 86400),
+    ("< 30 days", 30 * 86400),
+    ("30+ days", None),
+]
+
+
+def completion_bucket(task):
+    # Histogram bucket for how long a completed task took, or None
+    if not task.completed or task.start_ts is None or task.completion_ts is None:
+        return None
+    seconds = task.completion_ts - task.start_ts
+    for label, limit in COMPLETION_BUCKETS:
+        if limit is None or seconds < limit:
+            return label
+
+
+class TaskStats:
+    # Task counts kept up to date as tasks change, so charts and summaries
+    # read ready-made numbers instead of going over every task.
+
+    def __init__(self):
+        self.reset([])
+
+    def reset(self, tasks):
+        self.total = 0
+        self.completed = 0
+        self.by_category = Counter()
+        self.open_by_category = Counter()
+        self.by_priority = Counter()
+        self.completion_times = Counter()
+        for task in tasks:
+            self._count(task, 1)
+
+    def _count(self, task, sign):
+        completed = bool(task.completed)
+        category = task.category
+        self.total += sign
+        self.completed += sign * completed
+        self.by_category[category] += sign
+        if not completed:
+            self.open_by_category[category] += sign
+        self.by_priority[task.priority] += sign
+        bucket = completion_bucket(task)
+        if bucket is not None:
+            self.completion_times[bucket] += sign
+
+    def on_add(self, task):
+        self._count(task, 1)
+
+    def on_update(self, task, old):
+        previous = task.copy()
+        previous.update(old)
+        self._count(previous, -1)
+        self._count(task, 1)
+
+    def on_remove(self, task):
+        self._count(task, -1)
+
+    def copy(self):
+        # Independent copy, e.g. for a chart rendering on another thread
+        other = TaskStats()
+        other.total = self.total
+        other.completed = self.completed
+        other.by_category = self.by_category.copy()
+        other.open_by_category = self.open_by_category.copy()
+        other.by_priority = self.by_priority.copy()
+        other.completion_times = self.completion_times.copy()
+        return other
+
+    @property
+    def uncompleted(self):
+        return self.total - self.completed
+
+    def categories(self, open_only=False):
+        # Category -> count, leaving out categories that dropped to zero
+        counts = self.open_by_category if open_only else self.by_category
+        return {category: count for category, count in counts.items() if count > 0}
+
+    def histogram(self):
+        return [(label, self.completion_times[label]) for label, _ in COMPLETION_BUCKETS]
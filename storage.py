@@ -0,0 +1,741 @@
+import json
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from instrument import timer
+from sqlite_storage import SqliteStorage
+from binary_storage import BinaryTaskFile, write_binary
+from task import Task
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; there only one process should use a file
+    fcntl = None
+
+# Storage backends for the to-do list.
+#
+# load() returns a dict of task id -> task, in list order. The backend keeps
+# hold of that dict and is told about every change made to it through add(),
+# update() and delete(). save() replaces all tasks at once (used after an
+# import). close() flushes and releases anything the backend holds open.
+#
+# Changes made between begin() and commit() are written together in one go;
+# rollback() instead throws away whatever was not written yet.
+#
+# The file backends write through a commit window (TODO_COMMIT_WINDOW, in
+# seconds): a burst of changes inside the window costs one write and one
+# fsync, made on a background writer thread. Changes still inside the window
+# when the process dies are lost; close() writes them out.
+#
+# Several processes (the CLI and the GUI, say) can share one task file. Writes
+# take an advisory fcntl lock and are merged into whatever another process
+# wrote in the meantime. changed() tells, from a stat() of the files, whether
+# another process wrote since we last read; TaskStore.refresh() reloads only
+# then. Task ids are handed out through reserve_ids() so two processes never
+# give out the same id.
+
+# Default commit window in seconds
+COMMIT_WINDOW = float(os.environ.get('TODO_COMMIT_WINDOW', 0.2))
+
+# Bytes read at a time when looking back for the journal's last full line
+TAIL_CHUNK = 4096
+
+
+def index_tasks(task_list):
+    # Build the id -> Task index, giving ids to tasks saved before ids existed.
+    # Missing ids are handed out in file order after the highest existing id,
+    # so the same file always gets the same ids.
+    task_list = [Task.from_dict(task) for task in task_list]
+    next_id = max((task.id for task in task_list if task.id is not None), default=0) + 1
+    tasks = {}
+    for task in task_list:
+        if task.id is None:
+            task.id = next_id
+            next_id += 1
+        tasks[task.id] = task
+    return tasks
+
+
+def apply_record(tasks, record):
+    # Apply one mutation record to an in-memory id -> task index
+    op = record['op']
+    if op == 'add':
+        task = Task.from_dict(record['task'])
+        tasks[task.id] = task
+    elif op == 'update':
+        # The task may have been removed by another process in the meantime
+        task = tasks.get(record['id'])
+        if task is not None:
+            task.update(record['fields'])
+    elif op == 'delete':
+        tasks.pop(record['id'], None)
+    elif op == 'replace':
+        tasks.clear()
+        tasks.update(index_tasks(record['tasks']))
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+def fsync_directory(path):
+    # Make a rename inside the directory durable (not possible on Windows)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    # Write to a temp file, fsync it, then rename it over path. A crash at any
+    # point leaves either the old file or the new one, never half of one.
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, mode) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    fsync_directory(path)
+
+
+def file_signature(path):
+    # (inode, mtime, size) of path, or None if it doesn't exist. Files are
+    # replaced by rename, so any rewrite changes at least the inode.
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+class SharedFile:
+    # Coordinates processes sharing one task file through an advisory lock on
+    # filename + '.lock'. The lock file also holds the counters all of them
+    # must agree on: the next free task id and the last journal seq. Every
+    # reader takes the max with what it already knows, so losing the file
+    # only loses ids that are nowhere else: the ids of archived tasks are
+    # kept apart by the archive (Archive.skip_ids).
+
+    def __init__(self, filename):
+        self.lock_path = filename + '.lock'
+        self.compact_lock_path = filename + '.compact.lock'
+
+    @contextmanager
+    def locked(self, shared=False):
+        # flock locks belong to the open file, so this also keeps threads of
+        # the same process apart. Must not be nested.
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield fd
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+    def try_compact_lock(self):
+        # File descriptor holding the compaction lock, or None if another
+        # process is compacting. The lock goes away with the process, so a
+        # crashed compaction doesn't block the next one.
+        fd = os.open(self.compact_lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+        return fd
+
+    def read_counters(self, fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, 4096)
+        try:
+            return json.loads(data) if data else {}
+        except ValueError:
+            return {}
+
+    def write_counters(self, fd, counters):
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps(counters).encode())
+
+    def reserve_ids(self, first, count):
+        # Reserve count task ids no other process will use, starting at
+        # first or later. Returns (start, stop).
+        with self.locked() as fd:
+            counters = self.read_counters(fd)
+            start = max(first, counters.get('next_id', 1))
+            counters['next_id'] = start + count
+            self.write_counters(fd, counters)
+        return start, start + count
+
+    def release_ids(self, start, stop):
+        # Hand back the unused end of a reservation, unless another process
+        # has reserved ids after it
+        with self.locked() as fd:
+            counters = self.read_counters(fd)
+            if counters.get('next_id') == stop:
+                counters['next_id'] = start
+                self.write_counters(fd, counters)
+
+
+class GroupCommit:
+    # Calls flush() once per commit window instead of once per change. The
+    # flushes run on a writer thread started by the first change of a burst:
+    # it waits out the window, and everything that arrived meanwhile goes out
+    # in the same write and fsync. Changes only set a flag, there is no
+    # queue; flush() takes whatever the backend has pending. The caller (the
+    # Tk loop, say) never waits on the disk. A window of 0 flushes right away
+    # on the caller's thread.
+    #
+    # The writer ends once nothing is left to write. It is not a daemon
+    # thread, so a program that exits without close() (EOF, Ctrl+C, an
+    # uncaught exception) still writes its last changes first.
+    #
+    # A flush that fails on the writer thread is handed to on_error (printed
+    # to stderr without one); the backend keeps the changes for the next try.
+
+    def __init__(self, flush, window, on_error=None):
+        self.flush = flush
+        self.window = window
+        self.on_error = on_error
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def touch(self):
+        if self.window <= 0:
+            self.flush()
+            return
+        with self._lock:
+            # A running writer picks this change up with the others
+            self._pending = True
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='storage-writer')
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._stopped.wait(self.window)
+            with self._lock:
+                # Changes from here on need another flush
+                self._pending = False
+            try:
+                self.flush()
+            except Exception as error:
+                if self.on_error is None:
+                    print(f"Could not write tasks: {error}", file=sys.stderr)
+                else:
+                    self.on_error(error)
+            with self._lock:
+                if not self._pending or self._thread is not threading.current_thread():
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                    return
+
+    def flush_now(self):
+        # On the caller's thread; errors go to the caller
+        self.flush()
+
+    def stop(self):
+        # End the writer thread and write what is left
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._pending = False
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+        self.flush()
+
+
+class JsonFileStorage:
+    # The original format: every change rewrites the whole todo_list.json.
+    # Writes are atomic and grouped by the commit window.
+    #
+    # The changes since the last write are also kept as records. If another
+    # process rewrote the file meanwhile, they are replayed onto its version
+    # instead of overwriting it.
+
+    def __init__(self, filename, commit_window=0, on_error=None):
+        self.filename = filename
+        self.tasks = {}
+        self.shared = SharedFile(filename)
+        self._signature = None
+        self._stale = False
+        self._changes = []
+        self._batching = False
+        self._batch_start = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._committer = GroupCommit(self._flush, commit_window, on_error)
+
+    def load(self):
+        # Unwritten changes go out first so a reload doesn't lose them
+        self._committer.flush_now()
+        with self.shared.locked(shared=True):
+            self.tasks = self._read()
+            self._signature = file_signature(self.filename)
+        self._stale = False
+        return self.tasks
+
+    def _read(self):
+        if not os.path.exists(self.filename):
+            return {}
+        with open(self.filename, 'r') as file:
+            return index_tasks(json.load(file))
+
+    def changed(self):
+        # True if another process wrote the file since we last read it
+        return self._stale or file_signature(self.filename) != self._signature
+
+    def reserve_ids(self, first, count):
+        return self.shared.reserve_ids(first, count)
+
+    def release_ids(self, start, stop):
+        self.shared.release_ids(start, stop)
+
+    def _write(self, record):
+        with self._lock:
+            self._changes.append(record)
+            self._dirty = True
+        if not self._batching:
+            self._committer.touch()
+
+    def _flush(self):
+        with self._write_lock:
+            with self._lock:
+                # A batch in progress is written out by commit()
+                if not self._dirty or self._batching:
+                    return
+                self._dirty = False
+                changes, self._changes = self._changes, []
+            try:
+                with timer('save_tasks'):
+                    self._write_changes(changes)
+            except BaseException:
+                # Keep them for the next flush
+                with self._lock:
+                    self._changes[:0] = changes
+                    if self._batching:
+                        self._batch_start += len(changes)
+                    self._dirty = True
+                raise
+
+    def _write_changes(self, changes):
+        # Caller holds self._write_lock
+        with self.shared.locked():
+            if self._stale or file_signature(self.filename) != self._signature:
+                # Another process wrote the file (now or before our last
+                # write) and our tasks lack its changes: replay ours onto
+                # the file's version instead
+                merged = self._read()
+                for record in changes:
+                    apply_record(merged, record)
+                tasks = list(merged.values())
+                self._stale = True
+            else:
+                # May run on the writer thread; copy before writing
+                tasks = list(self.tasks.values())
+            self._write_file(tasks)
+            self._signature = file_signature(self.filename)
+
+    def _write_file(self, tasks):
+        data = [task.to_dict() for task in tasks]
+        with atomic_write(self.filename) as file:
+            json.dump(data, file, indent=4)
+
+    def add(self, task):
+        self._write({'op': 'add', 'task': task.to_dict()})
+
+    def update(self, task_id, fields):
+        self._write({'op': 'update', 'id': task_id, 'fields': dict(fields)})
+
+    def delete(self, task_id):
+        self._write({'op': 'delete', 'id': task_id})
+
+    def save(self, tasks):
+        self.tasks = tasks
+        self._write({'op': 'replace', 'tasks': [task.to_dict() for task in tasks.values()]})
+
+    def begin(self):
+        self._batching = True
+        self._batch_start = len(self._changes)
+
+    def commit(self):
+        self._batching = False
+        if self._dirty:
+            self._committer.touch()
+
+    def rollback(self):
+        self._batching = False
+        with self._lock:
+            del self._changes[self._batch_start:]
+            self._dirty = bool(self._changes)
+            # self.tasks still has the batch's changes: write the ones before
+            # it by replaying them onto the file instead
+            self._stale = True
+
+    def close(self):
+        self._committer.stop()
+
+
+class BinaryFileStorage(JsonFileStorage):
+    # The tasks in the binary format of binary_storage.py (<name>.bin),
+    # rewritten whole like todo_list.json but with no JSON to parse or
+    # format. The first run imports todo_list.json.
+
+    def __init__(self, filename, commit_window=0, on_error=None):
+        # The lock and id counters stay with filename, shared with the
+        # other backends
+        super().__init__(filename, commit_window, on_error)
+        self.json_filename = filename
+        self.filename = os.path.splitext(filename)[0] + '.bin'
+
+    def load(self):
+        tasks = super().load()
+        if self._signature is None and tasks:
+            # Imported from todo_list.json; write the binary file now so the
+            # next start reads that instead
+            with self._write_lock:
+                with self.shared.locked():
+                    self._write_file(list(tasks.values()))
+                    self._signature = file_signature(self.filename)
+        return tasks
+
+    def _read(self):
+        if os.path.exists(self.filename):
+            with BinaryTaskFile(self.filename) as tasks:
+                return index_tasks(tasks)
+        if os.path.exists(self.json_filename):
+            # First run on an existing todo_list.json
+            with open(self.json_filename, 'r') as file:
+                return index_tasks(json.load(file))
+        return {}
+
+    def _write_file(self, tasks):
+        with atomic_write(self.filename, 'wb') as file:
+            write_binary(file, tasks)
+
+
+class JournalStorage:
+    # Appends one small JSON line per change to a journal instead of rewriting
+    # the whole list. Once the journal grows past compact_every records it is
+    # folded into a snapshot on a background thread. Lines are written and
+    # fsynced once per commit window.
+    #
+    # Files used for filename='todo_list.json':
+    #   todo_list.snapshot.json  {"seq": N, "tasks": [...]}
+    #   todo_list.journal        one record per line, each with a "seq"
+    #   todo_list.journal.old    journal being compacted (only while compacting)
+    #
+    # Records with seq <= the snapshot's seq are already part of the snapshot
+    # and are skipped on replay, so a crash at any point during compaction is
+    # safe. If no snapshot exists yet, the plain todo_list.json list is
+    # imported as the starting point.
+    #
+    # Other processes may append to the same journal. Seqs are handed out
+    # under the shared lock when lines are written, so they stay in file
+    # order across processes. Compaction builds the new snapshot from the old
+    # one and the rotated journal, not from memory, so it never misses
+    # another process's records, and the thread making changes (the Tk loop,
+    # say) never copies the whole list. With a commit window the check for
+    # compaction runs on the writer thread after each write.
+
+    def __init__(self, filename, compact_every=1000, commit_window=0, on_error=None):
+        self.filename = filename
+        base, _ = os.path.splitext(filename)
+        self.snapshot_path = base + '.snapshot.json'
+        self.journal_path = base + '.journal'
+        self.old_journal_path = self.journal_path + '.old'
+        self.compact_every = compact_every
+        self.tasks = {}
+        self.shared = SharedFile(filename)
+        self._signature = None
+        self._stale = False
+        self._seq = 0
+        self._journal = None
+        # Set when the journal may end in a torn line (see _trim_torn_tail)
+        self._check_tail = True
+        self._journal_records = 0
+        self._batch = None
+        self._pending = []
+        self._lock = threading.Lock()
+        # Held while lines go to disk, so self._lock (which every change
+        # takes) is never held across a write and fsync
+        self._write_lock = threading.Lock()
+        self._compactor = None
+        self._committer = GroupCommit(self._flush, commit_window, on_error)
+
+    def load(self):
+        # The writer thread must not touch the journal while it is reopened
+        with self._write_lock:
+            if self._journal is not None:
+                self._journal.close()
+            with self.shared.locked(shared=True):
+                self._journal = open(self.journal_path, 'a')
+                self.tasks, snapshot_seq = self._read_snapshot()
+                self._seq = snapshot_seq
+                self._journal_records = 0
+                for path in (self.old_journal_path, self.journal_path):
+                    for record in self._read_journal(path):
+                        if record['seq'] <= snapshot_seq:
+                            continue
+                        apply_record(self.tasks, record)
+                        self._seq = record['seq']
+                        self._journal_records += 1
+                self._signature = file_signature(self.journal_path)
+                # A crash may have left half a line; it is cut off before
+                # our next write (that needs the exclusive lock)
+                self._check_tail = True
+            with self._lock:
+                # Reloading after another process wrote: our unwritten
+                # changes go on top, and out with the next flush as usual
+                for line in self._pending:
+                    apply_record(self.tasks, json.loads(line))
+                self._journal_records += len(self._pending)
+        self._stale = False
+
+        if os.path.exists(self.old_journal_path):
+            # A previous compaction did not finish; finish it now unless
+            # another process is still at it
+            self._start_compaction()
+        return self.tasks
+
+    def _read_snapshot(self):
+        # The tasks and seq the journal records apply on top of
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as file:
+                snapshot = json.load(file)
+            return index_tasks(snapshot['tasks']), snapshot['seq']
+        if os.path.exists(self.filename):
+            # First run on an existing todo_list.json
+            with open(self.filename, 'r') as file:
+                return index_tasks(json.load(file)), 0
+        return {}, 0
+
+    def _read_journal(self, path):
+        try:
+            file = open(path, 'r')
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn line from a crash mid-append; the records
+                    # after it are still good
+                    continue
+                yield record
+
+    def changed(self):
+        # True if another process appended or compacted since we last read.
+        # Compaction replaces the journal, so the journal alone tells.
+        return self._stale or file_signature(self.journal_path) != self._signature
+
+    def reserve_ids(self, first, count):
+        return self.shared.reserve_ids(first, count)
+
+    def release_ids(self, start, stop):
+        self.shared.release_ids(start, stop)
+
+    def _append(self, record):
+        # The seq is filled in when the line is written
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            if self._batch is not None:
+                self._batch.append(line)
+                return
+            self._pending.append(line)
+            self._journal_records += 1
+        self._committer.touch()
+
+    def _write_lines(self, fd, lines):
+        # Caller holds self._write_lock and the shared lock (fd)
+        if file_signature(self.journal_path) != self._signature:
+            # Another process wrote since we last looked; a compaction there
+            # may have moved our open journal out of the way
+            self._stale = True
+            self._check_tail = True
+            if os.fstat(self._journal.fileno()).st_ino != os.stat(self.journal_path).st_ino:
+                self._journal.close()
+                self._journal = open(self.journal_path, 'a')
+        if lines:
+            if self._check_tail:
+                self._trim_torn_tail()
+            counters = self.shared.read_counters(fd)
+            seq = max(counters.get('seq', 0), self._seq)
+            numbered = []
+            for line in lines:
+                seq += 1
+                numbered.append('{"seq": %d, %s' % (seq, line[1:]))
+            try:
+                self._journal.write(''.join(numbered))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except BaseException:
+                # May have written part of a line
+                self._check_tail = True
+                raise
+            self._seq = counters['seq'] = seq
+            self.shared.write_counters(fd, counters)
+        self._signature = file_signature(self.journal_path)
+
+    def _trim_torn_tail(self):
+        # Caller holds the shared lock. Cut off a last line left without its
+        # newline by a crash mid-append; otherwise the next record would be
+        # glued onto it and lost with it on the next load.
+        with open(self.journal_path, 'rb+') as file:
+            end = position = file.seek(0, os.SEEK_END)
+            while position > 0:
+                step = min(TAIL_CHUNK, position)
+                position -= step
+                file.seek(position)
+                chunk = file.read(step)
+                if position + step == end and chunk.endswith(b'\n'):
+                    break
+                newline = chunk.rfind(b'\n')
+                if newline >= 0:
+                    file.truncate(position + newline + 1)
+                    break
+            else:
+                file.truncate(0)
+        self._check_tail = False
+
+    def _flush(self):
+        # Changes keep coming in (under self._lock) while the lines are written
+        with self._write_lock:
+            with self._lock:
+                if self._journal is None or not self._pending:
+                    return
+                lines, self._pending = self._pending, []
+            try:
+                with timer('save_tasks'), self.shared.locked() as fd:
+                    self._write_lines(fd, lines)
+            except BaseException:
+                # Keep them, in order, for the next flush
+                with self._lock:
+                    self._pending[:0] = lines
+                raise
+        with self._lock:
+            due = self._journal_records >= self.compact_every
+        if due:
+            self._start_compaction()
+
+    def begin(self):
+        with self._lock:
+            self._batch = []
+
+    def commit(self):
+        with self._lock:
+            lines, self._batch = self._batch, None
+            if not lines:
+                return
+            self._pending.extend(lines)
+            self._journal_records += len(lines)
+        self._committer.touch()
+
+    def rollback(self):
+        with self._lock:
+            self._batch = None
+
+    def add(self, task):
+        self._append({'op': 'add', 'task': task.to_dict()})
+
+    def update(self, task_id, fields):
+        self._append({'op': 'update', 'id': task_id, 'fields': fields})
+
+    def delete(self, task_id):
+        self._append({'op': 'delete', 'id': task_id})
+
+    def save(self, tasks):
+        self.tasks = tasks
+        self._append({'op': 'replace', 'tasks': [task.to_dict() for task in tasks.values()]})
+
+    def _start_compaction(self):
+        # Only rotates the journal; the compaction thread does the rest
+        with self._write_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            with self._lock:
+                self._journal_records = 0
+            with self.shared.locked():
+                guard = self.shared.try_compact_lock()
+                if guard is None:
+                    # Another process is compacting
+                    return
+                if not os.path.exists(self.old_journal_path):
+                    if file_signature(self.journal_path) != self._signature:
+                        # Records we haven't read yet move with the journal
+                        self._stale = True
+                    # Rotate the journal; new records go to a fresh file
+                    self._journal.close()
+                    os.replace(self.journal_path, self.old_journal_path)
+                    self._journal = open(self.journal_path, 'a')
+                    self._signature = file_signature(self.journal_path)
+            self._compactor = threading.Thread(target=self._compact, args=(guard,), name='storage-compactor')
+            self._compactor.start()
+
+    def _compact(self, guard):
+        # Nothing writes to the rotated journal any more, and only the holder
+        # of the compaction lock replaces the snapshot
+        try:
+            tasks, seq = self._read_snapshot()
+            for record in self._read_journal(self.old_journal_path):
+                if record['seq'] > seq:
+                    apply_record(tasks, record)
+                    seq = record['seq']
+            with atomic_write(self.snapshot_path) as file:
+                json.dump({'seq': seq, 'tasks': [task.to_dict() for task in tasks.values()]}, file)
+            # Under the lock so a reader never sees the old snapshot without
+            # the old journal
+            with self.shared.locked():
+                os.remove(self.old_journal_path)
+        finally:
+            os.close(guard)
+
+    def close(self):
+        self._committer.stop()
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+STORAGE_BACKENDS = {
+    'json': JsonFileStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteStorage,
+    'binary': BinaryFileStorage,
+}
+
+
+def open_storage(filename, backend=None, commit_window=None, on_error=None):
+    # The backend can be picked with the TODO_STORAGE environment variable.
+    # on_error gets the exception of a write that failed on a file backend's
+    # writer thread.
+    backend = backend or os.environ.get('TODO_STORAGE', 'journal')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    if backend == 'sqlite':
+        # SQLite already groups commits in its WAL; its writes raise in the
+        # caller
+        return SqliteStorage(filename)
+    commit_window = COMMIT_WINDOW if commit_window is None else commit_window
+    return STORAGE_BACKENDS[backend](filename, commit_window=commit_window, on_error=on_error)
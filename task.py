@@ -0,0 +1,166 @@
+from datetime import datetime
+
+# Fields of a task, in the order todo_list.json has them. "ongoing" only
+# appears on some tasks and "id" once the task is in a store; both are left
+# out when unset.
+FIELDS = ('name', 'priority', 'completed', 'ongoing', 'start_date',
+          'completion_date', 'category', 'reminder_date', 'id')
+OPTIONAL_FIELDS = ('ongoing', 'id')
+
+_FIELD_SET = frozenset(FIELDS)
+
+# Priorities from lowest to highest
+PRIORITIES = ('Low', 'Medium', 'High')
+
+
+def parse_timestamp(text):
+    # Epoch seconds of "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD", or None
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_field(name, stamp):
+    # Date string that keeps its parsed epoch time (stamp) up to date
+    def get(self):
+        return getattr(self, name)
+
+    def set(self, value):
+        setattr(self, name, value)
+        setattr(self, stamp, parse_timestamp(value))
+
+    return property(get, set)
+
+
+class Task:
+    # One task. The dates are parsed once, when the task is created or a date
+    # changes, into start_ts, completion_ts and reminder_ts (epoch seconds or
+    # None), so reminder checks and statistics never parse strings.
+    #
+    # Also reads and writes like the dict it replaces (task['name'],
+    # task.get('category'), task.update(...), dict(task)); to_dict() gives
+    # the todo_list.json form. Keys outside FIELDS, e.g. from an imported
+    # file, are kept in extra.
+
+    __slots__ = ('id', 'name', 'priority', 'completed', 'ongoing', 'category',
+                 '_start_date', '_completion_date', '_reminder_date',
+                 'start_ts', 'completion_ts', 'reminder_ts', 'extra')
+
+    start_date = _date_field('_start_date', 'start_ts')
+    completion_date = _date_field('_completion_date', 'completion_ts')
+    reminder_date = _date_field('_reminder_date', 'reminder_ts')
+
+    def __init__(self, name=None, priority=None, completed=False, ongoing=None, start_date=None,
+                 completion_date=None, category=None, reminder_date=None, id=None, extra=None):
+        self.id = id
+        self.name = name
+        self.priority = priority
+        self.completed = completed
+        self.ongoing = ongoing
+        self.category = category
+        self.start_date = start_date
+        self.completion_date = completion_date
+        self.reminder_date = reminder_date
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        if 'extra' not in data:
+            try:
+                return cls(**data)
+            except TypeError:
+                # Keys outside FIELDS
+                pass
+        task = cls()
+        for key, value in data.items():
+            task[key] = value
+        return task
+
+    @classmethod
+    def from_parsed(cls, id, name, priority, completed, ongoing, category, start, completion, reminder):
+        # A task whose dates come already parsed, each as a (text, epoch
+        # seconds) pair, e.g. from a cache of dates seen before: skips the
+        # date setters, for readers that build many tasks at once
+        task = cls.__new__(cls)
+        task.id = id
+        task.name = name
+        task.priority = priority
+        task.completed = completed
+        task.ongoing = ongoing
+        task.category = category
+        task._start_date, task.start_ts = start
+        task._completion_date, task.completion_ts = completion
+        task._reminder_date, task.reminder_ts = reminder
+        task.extra = None
+        return task
+
+    def to_dict(self):
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None or field not in OPTIONAL_FIELDS:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        other = Task.__new__(Task)
+        for slot in Task.__slots__:
+            setattr(other, slot, getattr(self, slot))
+        if self.extra:
+            other.extra = dict(self.extra)
+        return other
+
+    def keys(self):
+        keys = [field for field in FIELDS if field not in OPTIONAL_FIELDS or getattr(self, field) is not None]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return key not in OPTIONAL_FIELDS or getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is None and key in OPTIONAL_FIELDS:
+                raise KeyError(key)
+            return value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            return default if value is None and key in OPTIONAL_FIELDS else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
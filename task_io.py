@@ -0,0 +1,169 @@
+import json
+from itertools import islice
+from storage import atomic_write, index_tasks
+from binary_storage import BinaryTaskFile, is_binary_file, write_binary
+
+# Streaming import and export of task files. Tasks are read and written one
+# at a time, so memory use doesn't grow with the size of the file. The
+# todo_list.json format (one JSON array), JSON Lines (one task per line,
+# .jsonl) and the binary format of binary_storage.py (.bin) are understood.
+
+CHUNK_SIZE = 1 << 16
+
+# Imported tasks are written to storage in batches of this many
+IMPORT_BATCH = 10000
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    # Yield the items of a top-level JSON array without loading it all;
+    # only the item currently being parsed is held in memory
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    # What may come next: '[' first, then an item or ']', after an item ','
+    # or ']', after a ',' an item
+    expect = '['
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n':
+            position += 1
+        if position == len(buffer) and not eof:
+            chunk = file.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+        if position == len(buffer):
+            raise ValueError("Unexpected end of file in JSON array")
+        char = buffer[position]
+        if expect == '[':
+            if char != '[':
+                raise ValueError("Expected a JSON array")
+            expect = 'first'
+            position += 1
+            continue
+        if char == ']' and expect in ('first', 'separator'):
+            return
+        if expect == 'separator':
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            expect = 'item'
+            position += 1
+            continue
+        if char in ',]':
+            raise ValueError(f"Expected an item in JSON array, got {char!r}")
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+            if end == len(buffer) and not eof:
+                # A number or literal may continue in the next chunk
+                raise ValueError
+        except ValueError:
+            if eof:
+                raise
+            # The item runs past the end of the buffer; read more
+            chunk = file.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+        yield item
+        expect = 'separator'
+        position = end
+        if position > chunk_size:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_task_file(filename):
+    # Tasks from a binary, JSON array or JSON Lines file, told apart by the
+    # first bytes
+    if is_binary_file(filename):
+        with BinaryTaskFile(filename) as tasks:
+            for task in tasks:
+                yield task.to_dict()
+        return
+    with open(filename, 'r') as file:
+        first = file.read(1)
+        while first and first.isspace():
+            first = file.read(1)
+        file.seek(0)
+        for item in iter_json_array(file) if first == '[' else iter_jsonl(file):
+            if not isinstance(item, dict):
+                raise ValueError(f"Expected a task object, got {json.dumps(item)[:40]}")
+            yield item
+
+
+def write_task_file(filename, tasks):
+    # .jsonl files get one task per line, .bin files the binary format;
+    # anything else a JSON array laid out like todo_list.json. A failed
+    # export doesn't leave half a file behind.
+    if filename.endswith('.bin'):
+        with atomic_write(filename, 'wb') as file:
+            return write_binary(file, tasks)
+    count = 0
+    with atomic_write(filename) as file:
+        if filename.endswith('.jsonl'):
+            for task in tasks:
+                file.write(json.dumps(task.to_dict()) + '\n')
+                count += 1
+        else:
+            file.write('[')
+            for task in tasks:
+                file.write(',\n    ' if count else '\n    ')
+                file.write(json.dumps(task.to_dict(), indent=4).replace('\n', '\n    '))
+                count += 1
+            file.write('\n]' if count else ']')
+    return count
+
+
+def convert_task_file(source, target):
+    # Rewrite a task file in the format target's name asks for (see
+    # write_task_file), e.g. todo_list.json -> todo_list.bin and back. Tasks
+    # without an id get the ones the store would give them.
+    return write_task_file(target, index_tasks(iter_task_file(source)).values())
+
+
+def task_key(task):
+    return (task.get('name'), task.get('category'), task.get('start_date'))
+
+
+class ImportInterrupted(ValueError):
+    # Reading the file failed after some chunks were already imported
+    def __init__(self, error, added, skipped):
+        super().__init__(str(error))
+        self.added = added
+        self.skipped = skipped
+
+
+def import_task_stream(store, tasks):
+    # Add tasks not already in the store, matching on (name, category,
+    # start_date). Returns (added, skipped). Each chunk is read whole before
+    # any of it is added; if reading fails, the chunks before stay imported
+    # and ImportInterrupted says how many tasks they added.
+    seen = {task_key(task) for task in store}
+    added = skipped = 0
+    tasks = iter(tasks)
+    while True:
+        try:
+            chunk = list(islice(tasks, IMPORT_BATCH))
+        except (ValueError, OSError) as error:
+            raise ImportInterrupted(error, added, skipped) from error
+        if not chunk:
+            break
+        with store.batch():
+            for task in chunk:
+                key = task_key(task)
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+                task.pop('id', None)
+                store.add(task)
+                added += 1
+    return added, skipped
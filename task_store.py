@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from datetime import datetime
+from storage import index_tasks
+from task import Task
+
+
+def new_task(name, priority, category, reminder_date=None):
+    # A fresh, open task as the CLI and the GUI create it
+    return Task(
+        name=name,
+        priority=priority,
+        completed=False,
+        start_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        completion_date=None,
+        category=category,
+        reminder_date=reminder_date,
+    )
+
+# Ids reserved at once by adds inside a batch
+ID_BLOCK = 100
+
+
+class TaskStore:
+    # Holds the tasks in a dict keyed by a permanent task id, so looking up,
+    # updating and removing a task doesn't depend on where it sits in a list.
+    # Every change is passed on to the storage backend.
+    #
+    # Listeners (reminder scheduler, counters, indexes) are kept in step with
+    # the tasks incrementally. A listener has reset(tasks), on_add(task),
+    # on_update(task, old) and on_remove(task); old holds the previous values
+    # of the fields that changed.
+    #
+    # refresh() reloads when another process changed the stored tasks; ids
+    # come from the backend's reserve_ids() so processes don't hand out the
+    # same one.
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.tasks = {}
+        self.listeners = []
+        # Bumped on every change, so caches can tell when the data moved on
+        self.version = 0
+        # Ids from _next_id up to _id_limit are reserved for this process
+        self._next_id = 1
+        self._id_limit = 1
+        self._batch_depth = 0
+
+    def load(self):
+        self.tasks = self.storage.load()
+        self._skip_used_ids()
+        self.version += 1
+        for listener in self.listeners:
+            listener.reset(self.tasks.values())
+        return self
+
+    def refresh(self):
+        # Reload if another process changed the stored tasks since we last
+        # read them. Costs a stat() when nothing changed. Returns True if the
+        # tasks were reloaded.
+        if self._batch_depth or not self.storage.changed():
+            return False
+        self.load()
+        return True
+
+    def _skip_used_ids(self):
+        first_free = max(self.tasks, default=0) + 1
+        if self._next_id < first_free:
+            self._next_id = self._id_limit = first_free
+
+    def skip_ids(self, last_used):
+        # Never hand out ids up to last_used, e.g. those of archived tasks
+        if self._next_id <= last_used:
+            self._next_id = self._id_limit = last_used + 1
+
+    def _take_id(self):
+        if self._next_id >= self._id_limit:
+            # One id at a time normally; a whole block inside a batch, to
+            # keep bulk adds from taking the lock for every task
+            count = ID_BLOCK if self._batch_depth else 1
+            self._next_id, self._id_limit = self.storage.reserve_ids(self._next_id, count)
+        task_id = self._next_id
+        self._next_id += 1
+        return task_id
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        listener.reset(self.tasks.values())
+        return listener
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __iter__(self):
+        return iter(self.tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self.tasks
+
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+    def list(self):
+        return list(self.tasks.values())
+
+    def find(self, category=None, priority=None, completed=None):
+        # Tasks matching every filter given. Backends with their own indexes
+        # (SQLite) answer this themselves; otherwise scan the dict.
+        if hasattr(self.storage, 'find'):
+            return [self.tasks[task_id] for task_id in self.storage.find(category, priority, completed)]
+        return [task for task in self.tasks.values()
+                if (category is None or task.get('category') == category)
+                and (priority is None or task.get('priority') == priority)
+                and (completed is None or task.get('completed', False) == completed)]
+
+    def add(self, task):
+        # Plain dicts (e.g. from an imported file) become Tasks
+        task = Task.from_dict(task)
+        task.id = self._take_id()
+        return self._insert(task)
+
+    def restore(self, task):
+        # Put a removed task back under the id it had (for undo). Ids are
+        # never handed out twice, so the id is still free.
+        task = Task.from_dict(task)
+        if task.id in self.tasks:
+            raise ValueError(f"Task {task.id} already exists")
+        return self._insert(task)
+
+    def _insert(self, task):
+        self.tasks[task.id] = task
+        self.storage.add(task)
+        self.version += 1
+        for listener in self.listeners:
+            listener.on_add(task)
+        return task.id
+
+    def update(self, task_id, **fields):
+        task = self.tasks[task_id]
+        old = {key: task.get(key) for key in fields}
+        task.update(fields)
+        self.storage.update(task_id, fields)
+        self.version += 1
+        for listener in self.listeners:
+            listener.on_update(task, old)
+        return task
+
+    def remove(self, task_id):
+        task = self.tasks.pop(task_id)
+        self.storage.delete(task_id)
+        self.version += 1
+        for listener in self.listeners:
+            listener.on_remove(task)
+        return task
+
+    def replace(self, task_list):
+        # Swap in a whole new list of tasks, e.g. after an import
+        self.tasks = index_tasks(task_list)
+        self._skip_used_ids()
+        self.storage.save(self.tasks)
+        self.version += 1
+        for listener in self.listeners:
+            listener.reset(self.tasks.values())
+
+    @contextmanager
+    def batch(self):
+        # Hand every change made inside the block to storage as one write.
+        # Nested batches join the outermost one.
+        self._batch_depth += 1
+        if self._batch_depth == 1:
+            self.storage.begin()
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.storage.rollback()
+                # The tasks and listeners still have the changes made before
+                # the error; read back what storage has
+                self.load()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            if self._next_id < self._id_limit:
+                # Don't leave a gap of ids the batch reserved but didn't use
+                self.storage.release_ids(self._next_id, self._id_limit)
+                self._id_limit = self._next_id
+            self.storage.commit()
+
+    def close(self):
+        self.storage.close()
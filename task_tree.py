@@ -0,0 +1,225 @@
+import bisect
+from instrument import timer
+
+
+def task_row(task):
+    status = "✔️" if task['completed'] else "❌"
+    return (status, task['name'], task['priority'], task['category'], task['reminder_date'])
+
+
+class TaskTreeView:
+    # Keeps a ttk.Treeview in step with a TaskStore as a store listener, so a
+    # change only touches the row it affects. Rows use the task id as iid and
+    # are shown in task id order unless set_sort() picks another key.
+    #
+    # With virtual=True only the rows around the visible window (plus
+    # `buffer` rows on each side) exist in the Treeview. The scrollbar is
+    # driven from here and covers the whole list, so redraw cost and widget
+    # memory stay the same however many tasks there are.
+    #
+    # set_filter() limits the rows to the tasks a search matched; tasks added
+    # or changed later are checked with the filter's match function.
+
+    def __init__(self, tree, scrollbar, virtual=False, rows=20, buffer=20):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.virtual = virtual
+        self.rows = rows
+        self.buffer = buffer
+        self.tasks = {}
+        # Shown tasks as sorted (key, id) entries; displayed back to front
+        # when self.reverse is set
+        self.order = []
+        self._entries = {}
+        self.sort_key = None
+        self.reverse = False
+        self.match = None
+        self.start = 0
+        self._window = (0, 0)
+        self._rendering = False
+        if virtual:
+            tree.configure(height=rows, yscrollcommand=self._on_tree_scrolled)
+            scrollbar.configure(command=self._on_scrollbar)
+            tree.bind("<MouseWheel>", self._on_mousewheel)
+            tree.bind("<Button-4>", lambda event: self._scroll_by(-3))
+            tree.bind("<Button-5>", lambda event: self._scroll_by(3))
+        else:
+            tree.configure(yscrollcommand=scrollbar.set)
+            scrollbar.configure(command=tree.yview)
+
+    # Store listener
+
+    def reset(self, tasks):
+        with timer('update_task_list'):
+            self.tasks = {task['id']: task for task in tasks}
+            self._rebuild()
+
+    def on_add(self, task):
+        with timer('update_task_list'):
+            self.tasks[task['id']] = task
+            if self.match is None or self.match(task):
+                self._show(task)
+
+    def on_update(self, task, old):
+        with timer('update_task_list'):
+            task_id = task['id']
+            shown = task_id in self._entries
+            wanted = self.match is None or bool(self.match(task))
+            if shown and wanted and self._entries[task_id] == self._entry(task):
+                iid = str(task_id)
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=task_row(task))
+                return
+            # The change moved the task into or out of the filter, or to
+            # another place in the sort order
+            if shown:
+                self._hide(task_id)
+            if wanted:
+                self._show(task)
+
+    def on_remove(self, task):
+        with timer('update_task_list'):
+            del self.tasks[task['id']]
+            if task['id'] in self._entries:
+                self._hide(task['id'])
+
+    # Filtering and sorting
+
+    def set_filter(self, match, ids=None):
+        # Show only tasks for which match(task) is true, or every task if
+        # match is None. ids, if given, are the matching ids already worked
+        # out (by a search index), saving a pass over all tasks.
+        self.match = match
+        self._rebuild(ids)
+
+    def set_sort(self, key=None, reverse=False, index=None):
+        # Order rows by key(task) (task id if None), descending if reverse.
+        # index, a SortedIndex over the same key kept by the store, gives the
+        # order without sorting when no filter is set.
+        self.sort_key = key
+        self.reverse = reverse
+        if index is not None and self.match is None:
+            self.order = list(index.all)
+            self._entries = {entry[1]: entry for entry in self.order}
+            self.start = 0
+            self._redraw()
+        else:
+            self._rebuild()
+
+    def _entry(self, task):
+        return (task['id'] if self.sort_key is None else self.sort_key(task), task['id'])
+
+    def _rebuild(self, ids=None):
+        if self.match is None:
+            shown = self.tasks.values()
+        elif ids is not None:
+            shown = [self.tasks[task_id] for task_id in ids if task_id in self.tasks]
+        else:
+            shown = [task for task in self.tasks.values() if self.match(task)]
+        self.order = sorted(self._entry(task) for task in shown)
+        self._entries = {entry[1]: entry for entry in self.order}
+        self.start = 0
+        self._redraw()
+
+    def _displayed(self, low, high):
+        # Ids at display positions low..high
+        if not self.reverse:
+            return [entry[1] for entry in self.order[low:high]]
+        size = len(self.order)
+        return [entry[1] for entry in reversed(self.order[size - high:size - low])]
+
+    def _redraw(self):
+        self.tree.delete(*self.tree.get_children())
+        if self.virtual:
+            self._window = (0, 0)
+            self.render()
+        else:
+            for task_id in self._displayed(0, len(self.order)):
+                self.tree.insert("", "end", iid=str(task_id), values=task_row(self.tasks[task_id]))
+
+    def _show(self, task):
+        entry = self._entry(task)
+        position = bisect.bisect_left(self.order, entry)
+        self.order.insert(position, entry)
+        self._entries[entry[1]] = entry
+        if self.virtual:
+            self.render()
+        else:
+            if self.reverse:
+                position = len(self.order) - 1 - position
+            self.tree.insert("", position, iid=str(entry[1]), values=task_row(task))
+
+    def _hide(self, task_id):
+        entry = self._entries.pop(task_id)
+        del self.order[bisect.bisect_left(self.order, entry)]
+        if self.tree.exists(str(task_id)):
+            self.tree.delete(str(task_id))
+        if self.virtual:
+            self.render()
+
+    # Virtual scrolling
+
+    def render(self):
+        # Materialize the rows around self.start and drop the rest
+        with timer('render_task_list'):
+            self.start = max(0, min(self.start, len(self.order) - self.rows))
+            low = max(0, self.start - self.buffer)
+            high = min(len(self.order), self.start + self.rows + self.buffer)
+            wanted = [str(task_id) for task_id in self._displayed(low, high)]
+            wanted_set = set(wanted)
+            existing = self.tree.get_children()
+            stale = [iid for iid in existing if iid not in wanted_set]
+            if stale:
+                self.tree.delete(*stale)
+            for position, iid in enumerate(wanted):
+                if self.tree.exists(iid):
+                    self.tree.move(iid, "", position)
+                else:
+                    self.tree.insert("", position, iid=iid, values=task_row(self.tasks[int(iid)]))
+            self._window = (low, high)
+
+            self._rendering = True
+            self.tree.yview_moveto((self.start - low) / max(high - low, 1))
+            self._rendering = False
+            self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = max(len(self.order), 1)
+        self.scrollbar.set(self.start / total, min(self.start + self.rows, total) / total)
+
+    def _scroll_to(self, start):
+        self.start = max(0, min(int(start), len(self.order) - self.rows))
+        low, high = self._window
+        margin = self.buffer // 2
+        room_above = low == 0 or self.start - low >= margin
+        room_below = high == len(self.order) or high - (self.start + self.rows) >= margin
+        if not (room_above and room_below):
+            self.render()
+            return
+        # Still well inside the materialized rows; just scroll the tree
+        self._rendering = True
+        self.tree.yview_moveto((self.start - low) / max(high - low, 1))
+        self._rendering = False
+        self._update_scrollbar()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.start + rows)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * len(self.order))
+        elif unit == "pages":
+            self._scroll_by(int(amount) * self.rows)
+        else:
+            self._scroll_by(int(amount))
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_tree_scrolled(self, first, last):
+        # The tree scrolled itself (keyboard navigation, see()); follow it
+        if self._rendering:
+            return
+        low, high = self._window
+        self._scroll_to(low + round(float(first) * (high - low)))
@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from storage import JournalStorage
+from task_store import TaskStore, new_task
+
+# Run with: python -m unittest test_storage  (or python -m pytest)
+
+
+class JournalTornTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'todo_list.json')
+        with open(self.filename, 'w') as file:
+            json.dump([], file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_store(self):
+        return TaskStore(JournalStorage(self.filename)).load()
+
+    def test_records_after_a_torn_line_survive_a_reload(self):
+        store = self.open_store()
+        first = store.add(new_task('before the crash', 'Low', 'Home'))
+        store.close()
+        # A crash in the middle of appending the next record
+        with open(store.storage.journal_path, 'a') as file:
+            file.write('{"seq": 99, "op": "add", "task": {"name": "ha')
+
+        store = self.open_store()
+        self.assertEqual(list(store.tasks), [first])
+        second = store.add(new_task('after the crash', 'High', 'Work'))
+        store.close()
+
+        store = self.open_store()
+        self.assertEqual(sorted(task.name for task in store), ['after the crash', 'before the crash'])
+        self.assertEqual(sorted(store.tasks), sorted([first, second]))
+        store.close()
+
+    def test_undecodable_line_does_not_hide_later_records(self):
+        store = self.open_store()
+        store.add(new_task('one', 'Low', 'Home'))
+        store.add(new_task('two', 'Low', 'Home'))
+        store.close()
+        with open(store.storage.journal_path) as file:
+            lines = file.readlines()
+        with open(store.storage.journal_path, 'w') as file:
+            file.write(lines[0] + 'not json\n' + lines[1])
+
+        store = self.open_store()
+        self.assertEqual(sorted(task.name for task in store), ['one', 'two'])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()